@@ -3,25 +3,69 @@
 # ============================================================
 
 import json
+import os
 import re
+import string
 import nltk
-from difflib import SequenceMatcher
+from functools import lru_cache
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import TreebankWordTokenizer
+from rapidfuzz import fuzz, process
+from shared_utils import orjson
 
 
 # -------------------------------------------------
 # NLTK SETUP (RUN ONCE)
 # -------------------------------------------------
-try:
-    nltk.data.find("tokenizers/punkt")
-except LookupError:
-    nltk.download("punkt")
-    nltk.download("stopwords")
-    nltk.download("wordnet")
-
-stop_words = set(stopwords.words("english"))
+NLTK_RESOURCES = {"stopwords": "corpora/stopwords", "wordnet": "corpora/wordnet"}
+
+def ensure_nltk_data():
+    # The env flag is inherited by pool workers, so only the parent walks the data path
+    if os.environ.get("NLTK_READY"):
+        return
+    for name, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(name)
+    os.environ["NLTK_READY"] = "1"
+
+ensure_nltk_data()
+
+
+@lru_cache(maxsize=None)
+def get_stop_words():
+    """Loaded on first use so callers that never lemmatize skip the corpus read."""
+    return frozenset(stopwords.words("english"))
+
 lemmatizer = WordNetLemmatizer()
+# Built once; word_tokenize re-dispatches through the Punkt loader on every call
+word_tokenizer = TreebankWordTokenizer()
+
+
+@lru_cache(maxsize=50000)
+def lemmatize_word(token):
+    """WordNet lookup memoized per token (word frequencies are heavy-tailed)."""
+    return lemmatizer.lemmatize(token)
+
+
+@lru_cache(maxsize=None)
+def get_spacy_lemmatizer():
+    """
+    Blank spaCy pipeline with the lookup lemmatizer, or None if unavailable.
+    Built on first use, so importing this module (e.g. in every pool worker)
+    doesn't pay for it.
+    """
+    try:
+        import spacy
+        nlp = spacy.blank("en")
+        nlp.add_pipe("lemmatizer", config={"mode": "lookup"})
+        nlp.initialize()
+        return nlp
+    except (ImportError, OSError, ValueError):
+        return None
+
 
 # -------------------------------------------------
 # CONSTANTS & RULES
@@ -44,14 +88,74 @@ LEGAL_WORDS = {
     "ai", "data"
 }
 
+# Compiled once at import; the helpers below run over every line of every report.
+_URL_RE = re.compile(r"https?:\/\/\S+")
+# Single-pass markdown stripper: linked image | image | link (group 1) | raw URL
+_MD_RE = re.compile(
+    r"\[!\[.*?\]\(.*?\)\]\(.*?\)|!\[.*?\]\(.*?\)|\[(.*?)\]\(.*?\)|https?:\/\/\S+"
+)
+_IMG_OR_URL_RE = re.compile(r"!\[.*?\]\(.*?\)|https?:\/\/\S+")
+_WS_RE = re.compile(r"\s+")
+_NON_ALPHA_RE = re.compile(r"[^a-zA-Z ]")
+_URL_DOMAIN_RE = re.compile(r'\b(?:https?://|www\.)?([a-zA-Z0-9-]+\.(?:com|ai|io|co|net|org))\b')
+_EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+_PHONE_RE = re.compile(r"(?:\+?\d{1,3}[\s\-]?)?(?:\(?\d{2,4}\)?[\s\-]?)?\d{3,4}[\s\-]?\d{3,4}")
+_FIN_RE = re.compile(
+    r"(?P<rev>\$(?P<rev_amount>[\d\.]+)\s*(?P<rev_unit>M|B))"
+    r"|(?P<emp>Employees?\s*[:\-]?\s*(?P<emp_count>[\d,]+))",
+    re.I
+)
+_SENT_SPLIT_RE = re.compile(r"[.\n]")
+# Patterns below without re.I run on lower_keep_offsets() text: a case-sensitive
+# literal prefix lets the engine skip ahead instead of case-folding every char.
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_ROLE_RE = re.compile(
+    r"(co[- ]?founder|founder|chief executive officer|ceo|chief technology officer|cto|"
+    r"chief financial officer|cfo|vice president|vp|director|board member|chairman|president)"
+)
+# Every _ROLE_RE alternative contains one of these substrings
+_ROLE_HINTS = ("founder", "chief", "ceo", "cto", "cfo", "vp", "director", "board member", "chairman", "president")
+_NAME_RE = re.compile(r"\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})\b")
+_TRACXN_COMPETITORS_RE = re.compile(
+    r"top[ \n]competitors?[ \n]of[ \n].*?[ \n]include(.*?)(?:\.|here[ \n]is)", re.S
+)
+_RR_COMPETITORS_RE = re.compile(r"competitors[^\S\n]*[:\-]?[^\S\n]*(.*)")
+_COMPETITOR_LINK_RE = re.compile(r"\[([A-Za-z0-9&.\- ]{2,50})\]\(")
+_LIST_SPLIT_RE = re.compile(r",| and ")
+_NEWS_SECTION_RE = re.compile(
+    r"news related to .*?\n[-]+\n(.*?)(?:get curated news|view complete company profile|$)",
+    re.S
+)
+# Pattern for [Title](URL) Source • Date • [Related Companies]
+_NEWS_ITEM_RE = re.compile(
+    r"\[([^\]]{10,200})\]\(((?i:https?):\/\/[^\)]+)\)"
+    r"(?:(?:\s+)?([A-Za-z ]+))?•([A-Za-z]{3} \d{2}, \d{4})•([^\n]+)"
+)
+_RELATED_LINK_RE = re.compile(r"\[([A-Za-z0-9&.\- ]+)\]\(")
+_SANITIZE_RE = re.compile(r"[^A-Za-z0-9&.\- ]")
+_JUNK_RE = re.compile(r"image|logo|extension", re.I)
+
+COMMON_LOCATIONS = ["India", "USA", "United States", "UK", "UAE", "Canada", "Australia"]
+_LOCATION_NAMES = {c.lower(): c for c in COMMON_LOCATIONS}
+# One case-insensitive walk over the text instead of a lower() + scan per country
+_LOCATION_RE = re.compile(
+    r"\b(" + "|".join(re.escape(c) for c in COMMON_LOCATIONS) + r")\b", re.I
+)
+
 def safe_int(value):
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, str):
+        # isdecimal() is exactly what int() accepts, so no exception on the miss path
+        s = value.strip()
+        if s.isdecimal() or (s[:1] in "+-" and s[1:].isdecimal()):
+            return int(s)
+        return None
     try:
-        if value is None:
-            return None
-        if isinstance(value, str) and value.strip() == "":
-            return None
         return int(value)
-    except:
+    except (TypeError, ValueError, OverflowError):
         return None
 
 
@@ -59,20 +163,38 @@ def safe_int(value):
 # UTILITY FUNCTIONS
 # -------------------------------------------------
 
+def lower_keep_offsets(text):
+    """Lower-cased copy of text whose offsets line up with the original."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # A few characters (e.g. "İ") expand when lowered; fold A-Z only
+    return text.translate(_ASCII_LOWER)
+
+def _md_replacement(m):
+    link_text = m.group(1)
+    if link_text is None:
+        return " "
+    # Link text can itself be a bare URL
+    return _URL_RE.sub(" ", link_text)
+
 def strip_markdown_and_urls(text):
     """Removes images and link syntax, leaving only display text."""
     if not text:
         return ""
-    # Remove images: ![alt](url)
-    text = re.sub(r"!\[.*?\]\(.*?\)", " ", text)
-    # Convert links: [Text](url) -> Text
-    text = re.sub(r"\[(.*?)\]\(.*?\)", r"\1", text)
-    # Remove raw URLs
-    text = re.sub(r"https?:\/\/\S+", " ", text)
-    return re.sub(r"\s+", " ", text).strip()
+    # Images and raw URLs -> " ", links [Text](url) -> Text, in one pass
+    text = _MD_RE.sub(_md_replacement, text)
+    return _WS_RE.sub(" ", text).strip()
 
+def strip_markdown_preserve_lines(text):
+    """strip_markdown_and_urls without the whitespace collapse, so lines survive."""
+    if not text:
+        return ""
+    return _MD_RE.sub(_md_replacement, text)
+
+@lru_cache(maxsize=1024)
 def extract_brand_keyword(company_name: str) -> str:
-    clean = re.sub(r"[^a-zA-Z ]", "", company_name.lower())
+    clean = _NON_ALPHA_RE.sub("", company_name.lower())
     words = clean.split()
     core = [w for w in words if w not in LEGAL_WORDS]
     return "".join(core if core else words)
@@ -86,85 +208,79 @@ def find_closest_company_website(text, company_name):
         return None
 
     brand = extract_brand_keyword(company_name)
-    url_pattern = r'\b(?:https?://|www\.)?([a-zA-Z0-9-]+\.(?:com|ai|io|co|net|org))\b'
 
-    candidates = []
-    for m in re.finditer(url_pattern, text.lower()):
-        domain = m.group(1)
-        if any(b in domain for b in BAD_DOMAINS):
-            continue
-
-        stem = domain.split(".")[0]
-        score = SequenceMatcher(None, brand, stem).ratio()
-        candidates.append((score, domain))
+    # Matches are always "label.tld", so an exact set lookup is enough
+    domains = list(dict.fromkeys(
+        d for d in (m.group(1) for m in _URL_DOMAIN_RE.finditer(text.lower()))
+        if d not in BAD_DOMAINS
+    ))
+    if not domains:
+        return None
 
+    # One batched RapidFuzz call scores every stem (0-100 scale)
+    stems = [d.split(".")[0] for d in domains]
+    matches = process.extract(brand, stems, scorer=fuzz.ratio, limit=None, score_cutoff=45)
+    candidates = [(score, domains[i]) for _, score, i in matches if score > 45]
     if candidates:
-        candidates.sort(reverse=True)
-        if candidates[0][0] > 0.45:
-            return f"https://{candidates[0][1]}"
+        return f"https://{max(candidates)[1]}"
     return None
 
-def extract_competitors(raw_text, company_name=None):
+def extract_competitors(raw_text, company_name=None, text_lower=None):
     competitors = set()
-    text = raw_text.replace("\n", " ")
+    if text_lower is None:
+        text_lower = lower_keep_offsets(raw_text)
 
-    # Case 1: Tracxn Style
-    tracxn_pattern = re.compile(r"Top competitors? of .*? include(.*?)(?:\.|\n|Here is)", re.I)
-    match = tracxn_pattern.search(text)
+    # Case 1: Tracxn Style (the pattern spans lines, so only the block is unwrapped)
+    match = _TRACXN_COMPETITORS_RE.search(text_lower)
     if match:
-        block = match.group(1)
+        block = raw_text[match.start(1):match.end(1)].replace("\n", " ")
         # Extract markdown links
-        links = re.findall(r"\[([A-Za-z0-9&.\- ]{2,50})\]\(", block)
+        links = _COMPETITOR_LINK_RE.findall(block)
         competitors.update(links)
         # Extract plain text
-        parts = re.split(r",| and ", block)
+        parts = _LIST_SPLIT_RE.split(block)
         for p in parts:
             p = strip_markdown_and_urls(p).strip()
             if 2 <= len(p) <= 50:
                 competitors.add(p)
 
     # Case 2: RocketReach/General List Style
-    rr_pattern = re.compile(r"Competitors\s*[:\-]?\s*(.*)", re.I)
-    for line in raw_text.split("\n"):
-        m = rr_pattern.search(line)
-        if m:
-            for c in m.group(1).split(","):
-                name = c.strip()
-                if 2 <= len(name) <= 50:
-                    competitors.add(name)
+    # "." stops at newlines, so each match is the rest of one line
+    for m in _RR_COMPETITORS_RE.finditer(text_lower):
+        for c in raw_text[m.start(1):m.end(1)].split(","):
+            name = c.strip()
+            if 2 <= len(name) <= 50:
+                competitors.add(name)
 
     # Final Cleanup
+    own_name = company_name.lower() if company_name else None
     cleaned = set()
     for c in competitors:
-        c = re.sub(r"[^A-Za-z0-9&.\- ]", "", c).strip()
-        if not c or (company_name and c.lower() == company_name.lower()):
+        c = _SANITIZE_RE.sub("", c).strip()
+        if not c or c.lower() == own_name:
             continue
-        if len(c.split()) > 6 or any(bad in c.lower() for bad in ["image", "logo", "extension"]):
+        if len(c.split()) > 6 or _JUNK_RE.search(c):
             continue
         cleaned.add(c)
     return sorted(cleaned)
 
-def extract_news(raw_text, company_name):
+def extract_news(raw_text, company_name, text_lower=None):
     news = []
+    if text_lower is None:
+        text_lower = lower_keep_offsets(raw_text)
+    # Cheap literal check before the DOTALL section regex
+    if "news related to" not in text_lower:
+        return news
+
     # Find the specific Tracxn news block
-    section_match = re.search(
-        r"News related to .*?\n[-]+\n(.*?)(?:Get curated news|View complete company profile|$)",
-        raw_text, re.S | re.I
-    )
+    section_match = _NEWS_SECTION_RE.search(text_lower)
     if not section_match:
         return news
 
-    news_block = section_match.group(1)
-    # Pattern for [Title](URL) Source • Date • [Related Companies]
-    news_pattern = re.compile(
-        r"\[([^\]]{10,200})\]\((https?:\/\/[^\)]+)\)"
-        r"(?:(?:\s+)?([A-Za-z ]+))?•([A-Za-z]{3} \d{2}, \d{4})•([^\n]+)",
-        re.I
-    )
-
-    for m in news_pattern.finditer(news_block):
+    news_block = raw_text[section_match.start(1):section_match.end(1)]
+    for m in _NEWS_ITEM_RE.finditer(news_block):
         related_raw = m.group(5)
-        related = re.findall(r"\[([A-Za-z0-9&.\- ]+)\]\(", related_raw)
+        related = _RELATED_LINK_RE.findall(related_raw)
         news.append({
             "title": m.group(1).strip(),
             "url": m.group(2).strip(),
@@ -177,25 +293,26 @@ def extract_news(raw_text, company_name):
 def extract_leadership(raw_text):
     leadership = {"founders": [], "board_members": [], "key_people": []}
     seen = set()
-    ROLE_REGEX = re.compile(
-        r"(co[- ]?founder|founder|chief executive officer|ceo|chief technology officer|cto|"
-        r"chief financial officer|cfo|vice president|vp|director|board member|chairman|president)",
-        re.I
-    )
-
-    for line in raw_text.split("\n"):
-        clean = strip_markdown_and_urls(line)
-        if not ROLE_REGEX.search(clean):
+
+    # Strip markdown over the whole document once; no pattern crosses a newline
+    for line in strip_markdown_preserve_lines(raw_text).split("\n"):
+        clean = " ".join(line.split())
+        clean_lower = lower_keep_offsets(clean)
+        # Substring prefilter: most lines mention no role at all
+        if not any(hint in clean_lower for hint in _ROLE_HINTS):
+            continue
+
+        role_match = _ROLE_RE.search(clean_lower)
+        if not role_match:
             continue
 
         # Find 2-4 capitalized words for the Name
-        name_match = re.search(r"\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,3})\b", clean)
+        name_match = _NAME_RE.search(clean)
         if not name_match:
             continue
 
         name = name_match.group(1)
-        role_match = ROLE_REGEX.search(clean)
-        role_text = clean[role_match.start():].split(".")[0].strip()
+        role_text = clean[role_match.start():].split(".", 1)[0].strip()
 
         if (name.lower(), role_text.lower()) in seen:
             continue
@@ -216,80 +333,98 @@ def extract_leadership(raw_text):
 
 def clean_text_light(text):
     if not text: return ""
-    text = re.sub(r"\!\[.*?\]\(.*?\)", " ", text)
-    text = re.sub(r"https?:\/\/\S+", " ", text)
-    return re.sub(r"\s+", " ", text).strip()
+    text = _IMG_OR_URL_RE.sub(" ", text)
+    return _WS_RE.sub(" ", text).strip()
 
 def clean_text_heavy(text):
-    tokens = nltk.word_tokenize(text.lower())
-    return " ".join([lemmatizer.lemmatize(t) for t in tokens if t.isalpha() and t not in stop_words])
+    stop_words = get_stop_words()
+    # spaCy's tokenizer + lookup table is far faster than word_tokenize + WordNet;
+    # NLTK stays as the fallback when spaCy / spacy-lookups-data aren't installed.
+    nlp = get_spacy_lemmatizer()
+    if nlp is not None:
+        doc = nlp(text.lower())
+        return " ".join(t.lemma_ for t in doc if t.is_alpha and t.text not in stop_words)
+    tokens = word_tokenizer.tokenize(text.lower())
+    return " ".join([lemmatize_word(t) for t in tokens if t.isalpha() and t not in stop_words])
 
 def extract_sentence_containing(text, keywords):
-    for s in re.split(r"[.\n]", text):
+    for s in _SENT_SPLIT_RE.split(text):
         if any(k.lower() in s.lower() for k in keywords):
             return s.strip()
     return None
 
 def extract_financials(text):
     data = {}
-    if m := re.search(r"\$([\d\.]+)\s*(M|B)", text, re.I):
-        data["estimated_revenue_usd"] = f"${m.group(1)}{m.group(2)}"
-    if m := re.search(r"Employees?\s*[:\-]?\s*([\d,]+)", text, re.I):
-        raw_emp = m.group(1).replace(",", "")
-        emp = safe_int(raw_emp)
-
-        if emp is not None:
-            data["employees"] = emp
+    rev_seen = emp_seen = False
+    # One walk over the text; the first hit of each field wins
+    for m in _FIN_RE.finditer(text):
+        if m.group("rev") and not rev_seen:
+            rev_seen = True
+            data["estimated_revenue_usd"] = f"${m.group('rev_amount')}{m.group('rev_unit')}"
+        elif m.group("emp") and not emp_seen:
+            emp_seen = True
+            raw_emp = m.group("emp_count").replace(",", "")
+            emp = safe_int(raw_emp)
+
+            if emp is not None:
+                data["employees"] = emp
+        if rev_seen and emp_seen:
+            break
 
     return data
 
 def extract_locations(text):
-    common = ["India", "USA", "United States", "UK", "UAE", "Canada", "Australia"]
-    return sorted({c for c in common if c.lower() in text.lower()})
+    return sorted({_LOCATION_NAMES[m.group(1).lower()] for m in _LOCATION_RE.finditer(text)})
 
 def extract_emails(text):
-    return sorted(set(re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)))
+    return sorted({m.group(0) for m in _EMAIL_RE.finditer(text)})
 
 def extract_phone_numbers(text):
-    matches = re.findall(r"(?:\+?\d{1,3}[\s\-]?)?(?:\(?\d{2,4}\)?[\s\-]?)?\d{3,4}[\s\-]?\d{3,4}", text)
-    return sorted({m for m in matches if 8 <= len(re.sub(r"\D", "", m)) <= 15})
+    # Counting digits in place avoids building a throwaway string per match
+    return sorted({
+        m for m in _PHONE_RE.findall(text)
+        if 8 <= sum(c.isdigit() for c in m) <= 15
+    })
 
 # -------------------------------------------------
 # MAIN PIPELINE
 # -------------------------------------------------
-import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def extract_company_intelligence(input_json, output_json):
-    input_json = Path(input_json)
-    output_json = Path(output_json)
-
-    if not input_json.exists():
-        raise FileNotFoundError(f"Input JSON not found: {input_json}")
-
-    with input_json.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    company_name = data.get("meta", {}).get("company_name", "")
-
-    combined_raw_text = ""
-    for r in data.get("financial_intelligence", []):
-        combined_raw_text += "\n" + r.get("content", "")
-        combined_raw_text += "\n" + r.get("raw_content", "")
+def read_json(path):
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_json(data, path):
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
 
-    clean_light = clean_text_light(combined_raw_text)
+def process_report(raw_text, meta):
+    """Pure extraction step: combined raw report text + meta -> structured dict."""
+    company_name = meta.get("company_name", "")
+    clean_light = clean_text_light(raw_text)
+    text_lower = lower_keep_offsets(raw_text)
 
-    output = {
-        "meta": data.get("meta", {}),
+    return {
+        "meta": meta,
         "company_profile": {
             "company_name": company_name,
-            "website": find_closest_company_website(combined_raw_text, company_name),
+            "website": find_closest_company_website(raw_text, company_name),
             "industry": extract_sentence_containing(clean_light, ["industry"]),
             "tagline": extract_sentence_containing(clean_light, ["specializing", "leader", "delivering"]),
         },
-        "leadership_team": extract_leadership(combined_raw_text),
-        "competitors": extract_competitors(combined_raw_text, company_name),
-        "news": extract_news(combined_raw_text, company_name),
+        "leadership_team": extract_leadership(raw_text),
+        "competitors": extract_competitors(raw_text, company_name, text_lower),
+        "news": extract_news(raw_text, company_name, text_lower),
         "financials": extract_financials(clean_light),
         "locations": extract_locations(clean_light),
         "contact_information": {
@@ -298,19 +433,45 @@ def extract_company_intelligence(input_json, output_json):
         }
     }
 
+def extract_company_intelligence(input_json, output_json):
+    input_json = Path(input_json)
+    output_json = Path(output_json)
+
+    if not input_json.exists():
+        raise FileNotFoundError(f"Input JSON not found: {input_json}")
+
+    data = read_json(input_json)
+
+    # Collect then join once; += on the accumulator is quadratic in report size
+    parts = []
+    for r in data.get("financial_intelligence", []):
+        parts.append(r.get("content") or "")
+        parts.append(r.get("raw_content") or "")
+    combined_raw_text = "".join("\n" + p for p in parts)
+
+    output = process_report(combined_raw_text, data.get("meta", {}))
+
     # ✅ Ensure output directory exists
     output_json.parent.mkdir(parents=True, exist_ok=True)
 
-    with output_json.open("w", encoding="utf-8") as f:
-        json.dump(output, f, indent=4, ensure_ascii=False)
+    write_json(output, output_json)
 
     print(f"✅ Extracted structured intelligence → {output_json}")
 
 
+def _clean_report_file(input_json, output_json):
+    """Process-pool worker: returns an error message instead of raising."""
+    try:
+        extract_company_intelligence(input_json=input_json, output_json=output_json)
+        return None
+    except Exception as e:
+        return str(e)
+
 
 def clean_all_unstructured_reports(
     unstructured_dir="Unstructured_data",
-    structured_dir="structured_data"
+    structured_dir="structured_data",
+    max_workers=None
 ):
     unstructured_dir = Path(unstructured_dir)
     structured_dir = Path(structured_dir)
@@ -323,21 +484,48 @@ def clean_all_unstructured_reports(
 
     structured_dir.mkdir(parents=True, exist_ok=True)
 
-    files = list(unstructured_dir.glob("*_Report.json"))
-
-    print(f"🧹 Cleaning {len(files)} unstructured reports...")
-
-    for file in files:
-        output_path = structured_dir / file.name.replace(
-            "_Report.json", "_Structured.json"
-        )
-
+    # scandir's DirEntry caches the file type from readdir, so no per-file stat
+    with os.scandir(unstructured_dir) as entries:
+        files = [
+            Path(e.path) for e in entries
+            if e.is_file() and e.name.endswith("_Report.json")
+        ]
+
+    pairs = [
+        (file, structured_dir / file.name.replace("_Report.json", "_Structured.json"))
+        for file in files
+    ]
+
+    # A structured file newer than its report is already up to date (the lead
+    # score written into it later only makes it newer). Rewriting it would
+    # defeat the uploader's mtime check and re-inject every score
+    stale = []
+    for file, output in pairs:
         try:
-            extract_company_intelligence(
-                input_json=file,
-                output_json=output_path
-            )
-        except Exception as e:
-            print(f"❌ Failed cleaning {file.name}: {e}")
+            if output.stat().st_mtime_ns >= file.stat().st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        stale.append((file, output))
+
+    print(f"🧹 Cleaning {len(stale)} unstructured reports ({len(pairs) - len(stale)} already up to date)...")
+
+    files = [file for file, _ in stale]
+    output_paths = [output for _, output in stale]
+
+    # Each report is independent, so spread them across cores.
+    # Spawned workers: this also runs on the dashboard's pipeline thread, and
+    # forking a multi-threaded process can deadlock the child.
+    workers = min(max_workers or os.cpu_count() or 1, len(files))
+    if workers > 1:
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=spawn) as executor:
+            errors = list(executor.map(_clean_report_file, files, output_paths, chunksize=4))
+    else:
+        errors = [_clean_report_file(f, o) for f, o in zip(files, output_paths)]
+
+    for file, error in zip(files, errors):
+        if error:
+            print(f"❌ Failed cleaning {file.name}: {error}")
 
     print("✅ All reports cleaned and structured.")
@@ -1,12 +1,22 @@
 import json
+import re
 import time
 import random
-import requests
+import asyncio
+import aiohttp
 import os
 import datetime
+from collections import deque
 from bs4 import BeautifulSoup
-from groq import Groq
+try:
+    from selectolax.parser import HTMLParser  # C parser, much faster than bs4
+except ImportError:  # BeautifulSoup + lxml fallback
+    HTMLParser = None
+from pydantic import BaseModel, Field, ValidationError
 from fake_useragent import UserAgent
+from groq_clients import close_groq_clients, get_groq_client
+from request_cache import InFlight, JsonCache, make_cache_key
+from shared_utils import get_api_keys, orjson
  
 # ==========================================
 # 🟢 1. CONFIGURATION
@@ -17,7 +27,23 @@ TARGET_COMPANIES = [
 ]
  
 FINAL_OUTPUT_FILE = "company_intel/Final_Company_Data_by_simple_approach.json"
+# Append-only log of results since the last compaction (one {company: result} per line)
+FINAL_OUTPUT_LOG = "company_intel/Final_Company_Data_by_simple_approach.jsonl"
 RAW_DEBUG_FILE = "raw_search_logs_by_simple_approach.txt"
+# Companies processed at the same time; each runs its two DDG queries concurrently,
+# so up to 2x this many searches are queued (ddg_throttle caps what is in flight)
+COMPANY_CONCURRENCY = 3
+# DuckDuckGo throttle: in-flight requests start at DDG_START_CONCURRENCY and adapt
+# between 1 and DDG_MAX_CONCURRENCY depending on how often we get the block page
+DDG_START_CONCURRENCY = 2
+DDG_MAX_CONCURRENCY = 4
+DDG_BASE_DELAY = 2.0    # Seconds between request starts (jittered)
+DDG_MAX_DELAY = 60.0
+DDG_RATE_WINDOW = 60.0  # Seconds of history used for the block rate
+# Companies analyzed per Groq request (shares the system prompt + round trip)
+GROQ_BATCH_SIZE = 10
+# Snippet characters per batch, keeps a batch well inside the TPM budget
+GROQ_BATCH_MAX_CHARS = 40000
 # Ensure output directory exists
 os.makedirs(os.path.dirname(FINAL_OUTPUT_FILE), exist_ok=True)
 
@@ -28,26 +54,60 @@ os.makedirs(os.path.dirname(FINAL_OUTPUT_FILE), exist_ok=True)
 # # Initialize AI Client
 # client = Groq(api_key=GROQ_API_KEY)
 
-# --- 🔑 DYNAMIC KEY LOADER ---
-def get_api_keys(prefix):
-    keys = []
-    i = 1
-    while True:
-        key = os.environ.get(f"{prefix}_{i}")
-        if key:
-            keys.append(key)
-            i += 1
-        else:
-            break
-    # Fallback: if without Number API key
-    if not keys and os.environ.get(prefix):
-        keys.append(os.environ.get(prefix))
-    return keys
-
 # Load all Groq Keys
 GROQ_KEYS = get_api_keys("GROQ_API_KEY")
 
 
+class KeyPool:
+    """
+    Per-key cooldown tracking for API key rotation.
+    Rate-limited keys back off exponentially (2s, 4s, ... capped at 2**6 x base)
+    and are skipped until their cooldown ends; rejected keys are retired.
+    """
+
+    BASE_BACKOFF = 2.0
+    MAX_BACKOFF_EXP = 6
+
+    def __init__(self, keys):
+        self.entries = [
+            {"index": i, "key": k, "next_ok_ts": 0.0, "failures": 0, "dead": False}
+            for i, k in enumerate(keys)
+        ]
+
+    def pick(self):
+        """Live key that becomes available soonest, or None if all are dead."""
+        live = [e for e in self.entries if not e["dead"]]
+        if not live:
+            return None
+        return min(live, key=lambda e: e["next_ok_ts"])
+
+    def report_success(self, entry):
+        entry["failures"] = 0
+
+    def report_failure(self, entry, status_code=None):
+        if status_code in (401, 403):
+            entry["dead"] = True
+            return
+        entry["failures"] += 1
+        if status_code == 429:
+            backoff = self.BASE_BACKOFF * 2 ** min(entry["failures"], self.MAX_BACKOFF_EXP)
+        else:
+            backoff = self.BASE_BACKOFF
+        entry["next_ok_ts"] = time.time() + backoff
+
+
+GROQ_KEY_POOL = KeyPool(GROQ_KEYS)
+
+GROQ_TIMEOUT = 60.0  # seconds per request (shared client pool lives in groq_clients.py)
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+# Analyses are reused while the scraped snippets stay identical (7 day max age)
+GROQ_ANALYSIS_CACHE = JsonCache("groq_analysis")
+# Identical analyses running at the same time share one Groq request
+GROQ_INFLIGHT = InFlight()
+
+
  
 # ==========================================
 # 🟢 2. HELPER FUNCTIONS
@@ -58,18 +118,75 @@ def save_raw_log(company, query, raw_text):
     with open(RAW_DEBUG_FILE, "a", encoding="utf-8") as f:
         f.write(f"\n{'='*50}\n🏢 {company} | 🔍 {query}\n{'-'*20}\n{raw_text}\n{'='*50}\n")
  
-def save_json(data):
-    """Saves the clean data to the JSON file."""
-    with open(FINAL_OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+def append_result(company, result):
+    """Appends one company's result to the JSONL log (one line = one record)."""
+    with open(FINAL_OUTPUT_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps({company: result}, ensure_ascii=False) + "\n")
+
+def load_final_data():
+    """
+    Rebuilds {company: result} from the last compacted JSON file plus every
+    record appended to the log since then.
+    """
+    final_data = {}
+    if os.path.exists(FINAL_OUTPUT_FILE):
+        try:
+            with open(FINAL_OUTPUT_FILE, "r", encoding="utf-8") as f:
+                final_data = json.load(f)
+        except (OSError, ValueError):
+            pass  # Unreadable / corrupt file: start fresh, the log below still applies
+
+    if os.path.exists(FINAL_OUTPUT_LOG):
+        with open(FINAL_OUTPUT_LOG, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    final_data.update(json.loads(line))
+                except ValueError:
+                    continue  # Partial last line from an interrupted run
+    return final_data
+
+def compact_final_data(final_data=None):
+    """
+    Writes the JSON object file the app reads, then drops the log it now contains.
+    """
+    if final_data is None:
+        final_data = load_final_data()
+
+    tmp_path = FINAL_OUTPUT_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(final_data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, FINAL_OUTPUT_FILE)
+
+    if os.path.exists(FINAL_OUTPUT_LOG):
+        os.remove(FINAL_OUTPUT_LOG)
  
 # ==========================================
 # 🟢 3. SEARCH ENGINE (DuckDuckGo)
 # ==========================================
  
-def search_ddg(query, time_filter=None):
+def parse_ddg_results(html, limit=10):
+    """(title, snippet) pairs from a DuckDuckGo HTML results page."""
+    pairs = []
+    if HTMLParser is not None:
+        for res in HTMLParser(html).css("div.result__body")[:limit]:
+            title = res.css_first("a.result__a")
+            snippet = res.css_first("a.result__snippet")
+            if title is not None and snippet is not None:
+                pairs.append((title.text(strip=True), snippet.text(strip=True)))
+        return pairs
+
+    soup = BeautifulSoup(html, "lxml")
+    for res in soup.find_all("div", class_="result__body", limit=limit):
+        title = res.find("a", class_="result__a")
+        snippet = res.find("a", class_="result__snippet")
+        if title is not None and snippet is not None:
+            pairs.append((title.get_text(strip=True), snippet.get_text(strip=True)))
+    return pairs
+
+async def search_ddg(session, query, time_filter=None):
     """
     Searches DuckDuckGo.
+    - session: Shared aiohttp.ClientSession.
     - query: The text to search.
     - time_filter: 'y' to get only results from the Past Year.
     """
@@ -89,25 +206,25 @@ def search_ddg(query, time_filter=None):
        
     try:
         print(f"      📡 Searching: '{query}'...")
-        response = requests.post(url, data=payload, headers=headers, timeout=20)
+        async with session.post(
+            url, data=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=20)
+        ) as response:
+            status = response.status
+            html = await response.text()
        
-        if response.status_code == 200:
+        if status == 200:
             # Check for Blocks
-            if "captcha" in response.text.lower() or "too many requests" in response.text.lower():
+            if "captcha" in html.lower() or "too many requests" in html.lower():
                 return "BLOCK"
  
-            soup = BeautifulSoup(response.text, "html.parser")
-            results = soup.find_all("div", class_="result__body", limit=10) # Get top 10 results
-           
-            combined_text = ""
-            for res in results:
-                title = res.find("a", class_="result__a").get_text(strip=True)
-                snippet = res.find("a", class_="result__snippet").get_text(strip=True)
-                combined_text += f"Source: {title}\nSnippet: {snippet}\n{'-'*10}\n"
+            combined_text = "".join(
+                f"Source: {title}\nSnippet: {snippet}\n{'-'*10}\n"
+                for title, snippet in parse_ddg_results(html, limit=10) # Get top 10 results
+            )
            
             return combined_text if combined_text.strip() else None
  
-        elif response.status_code in [429, 403]:
+        elif status in [429, 403]:
             return "BLOCK"
            
         return None
@@ -119,44 +236,76 @@ def search_ddg(query, time_filter=None):
 # ==========================================
 # 🟢 4. AI ANALYST (Groq)
 # ==========================================
-def analyze_with_groq(company_name, raw_data):
+
+# Define the system prompt with strict decision-making rules
+GROQ_SYSTEM_PROMPT = (
+    "You are a Senior Financial Data Analyst. Your job is to determine the single most accurate "
+    "Revenue and Employee count for a company based on search snippets.\n\n"
+    
+    "RULES FOR DECISION MAKING:\n"
+    "1. **Revenue:**\n"
+    "   - PRIORITY 1: If you see an INR (₹) figure from official sources (Tracxn, Zaubacorp, News) for FY24/25, USE IT. Convert to a clean string (e.g., '₹275 Cr').\n"
+    "   - PRIORITY 2: If no INR figure exists, use the most credible USD figure (e.g., from RocketReach or Press Release). \n"
+    "   - IGNORE: 'Growjo' or 'ZoomInfo' if they look like automated estimates (e.g., revenue per employee calculations).\n"
+    "2. **Employees:**\n"
+    "   - Trust 'RocketReach' or 'LinkedIn' snippets the most.\n"
+    "   - Prefer exact numbers (e.g., 402) over ranges (e.g., 200-500).\n"
+    "3. **Output Format:**\n"
+    "   - Return ONLY a simple JSON object. No lists, no sources, no explanations.\n"
+    "   - Keys must be exactly: 'Annual Revenue' and 'Total Employee Count'.\n\n"
+    "FORMAT EXAMPLE:\n"
+    "{\n"
+    '  "Annual Revenue": "$3 million",\n'
+    '  "Total Employee Count": 31\n'
+    "}"
+)
+
+# Only the company and its snippets change between calls
+GROQ_USER_TEMPLATE = "Target Company: {company}\n\nSearch Snippets:\n{snippets}"
+    
+# Same rules, but several companies per request
+GROQ_BATCH_SYSTEM_PROMPT = GROQ_SYSTEM_PROMPT + (
+    "\n\nBATCH MODE (overrides the output format above):\n"
+    "- The user message is a JSON list of companies, each with its own 'snippets'.\n"
+    "- Apply the rules to every company separately, using ONLY that company's snippets.\n"
+    "- Return one JSON object: "
+    '{"results": [{"company": "<name exactly as given>", "Annual Revenue": "...", "Total Employee Count": ...}]}\n'
+    "- Include exactly one entry per company, in the same order."
+)
+
+class CompanyAnalysis(BaseModel):
+    company: str
+    annual_revenue: str | int | float = Field(alias="Annual Revenue")
+    total_employee_count: str | int | float = Field(alias="Total Employee Count")
+
+class BatchAnalysis(BaseModel):
+    results: list[CompanyAnalysis]
+
+def analysis_cache_key(company_name, raw_data):
+    return make_cache_key(company_name, GROQ_MODEL, GROQ_SYSTEM_PROMPT, raw_data)
+
+async def groq_json_completion(system_prompt, user_content):
     """
-    Sends the gathered data to Groq to extract the single best answer.
-    Uses API Key Rotation to ensure reliability.
+    One JSON-mode chat completion with API key rotation.
+    Returns the parsed object, or None when every key failed.
     """
-    # Define the system prompt with strict decision-making rules
-    system_prompt = (
-        "You are a Senior Financial Data Analyst. Your job is to determine the single most accurate "
-        "Revenue and Employee count for a company based on search snippets.\n\n"
-        
-        "RULES FOR DECISION MAKING:\n"
-        "1. **Revenue:**\n"
-        "   - PRIORITY 1: If you see an INR (₹) figure from official sources (Tracxn, Zaubacorp, News) for FY24/25, USE IT. Convert to a clean string (e.g., '₹275 Cr').\n"
-        "   - PRIORITY 2: If no INR figure exists, use the most credible USD figure (e.g., from RocketReach or Press Release). \n"
-        "   - IGNORE: 'Growjo' or 'ZoomInfo' if they look like automated estimates (e.g., revenue per employee calculations).\n"
-        "2. **Employees:**\n"
-        "   - Trust 'RocketReach' or 'LinkedIn' snippets the most.\n"
-        "   - Prefer exact numbers (e.g., 402) over ranges (e.g., 200-500).\n"
-        "3. **Output Format:**\n"
-        "   - Return ONLY a simple JSON object. No lists, no sources, no explanations.\n"
-        "   - Keys must be exactly: 'Annual Revenue' and 'Total Employee Count'.\n\n"
-        "FORMAT EXAMPLE:\n"
-        "{\n"
-        '  "Annual Revenue": "$3 million",\n'
-        '  "Total Employee Count": 31\n'
-        "}"
-    )
-    
-    user_content = f"Target Company: {company_name}\n\nSearch Snippets:\n{raw_data}"
+    # 🔄 ROTATION LOGIC: always use the key that is available soonest
+    for attempt in range(2 * len(GROQ_KEYS)):
+        entry = GROQ_KEY_POOL.pick()
+        if entry is None:
+            break
+
+        wait = entry["next_ok_ts"] - time.time()
+        if wait > 0:
+            print(f"      ⏳ Groq keys cooling down, waiting {wait:.1f}s...")
+            await asyncio.sleep(wait)
 
-    # 🔄 ROTATION LOGIC: Iterate through all available API keys
-    for index, api_key in enumerate(GROQ_KEYS):
         try:
-            # Initialize the client with the current key in the loop
-            client = Groq(api_key=api_key)
+            # Reuse the selected key's client (keeps its connections alive)
+            client = get_groq_client(entry["key"], GROQ_TIMEOUT)
             
-            completion = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
+            completion = await client.chat.completions.create(
+                model=GROQ_MODEL,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_content}
@@ -164,49 +313,228 @@ def analyze_with_groq(company_name, raw_data):
                 temperature=0,
                 response_format={"type": "json_object"}
             )
-            return json.loads(completion.choices[0].message.content)
+            content = completion.choices[0].message.content
+            result = orjson.loads(content) if orjson is not None else json.loads(content)
+            GROQ_KEY_POOL.report_success(entry)
+            return result
 
         except Exception as e:
-            print(f"      ⚠️ Groq Key {index+1} Failed: {e}")
-            
-            # Check if there are more keys available to try
-            if index < len(GROQ_KEYS) - 1:
-                print("      🔄 Switching to next API Key...")
-                time.sleep(5) # Short pause before the next attempt
-            else:
-                # All keys have failed
-                print("      ❌ All Groq API Keys failed.")
-                return {"Annual Revenue": "Not Found", "Total Employee Count": "Not Found"}
+            print(f"      ⚠️ Groq Key {entry['index']+1} Failed: {e}")
+            GROQ_KEY_POOL.report_failure(entry, getattr(e, "status_code", None))
+            print("      🔄 Switching to next API Key...")
+
+    # All keys have failed
+    print("      ❌ All Groq API Keys failed.")
+    return None
+
+async def analyze_with_groq(company_name, raw_data):
+    """
+    Sends the gathered data to Groq to extract the single best answer.
+    Uses API Key Rotation to ensure reliability.
+    """
+    cache_key = analysis_cache_key(company_name, raw_data)
+    cached = GROQ_ANALYSIS_CACHE.get(cache_key)
+    if cached is not None:
+        print("      💾 Using cached Groq analysis.")
+        return cached
+
+    return await GROQ_INFLIGHT.run(
+        cache_key, lambda: call_groq(company_name, raw_data, cache_key)
+    )
+
+async def call_groq(company_name, raw_data, cache_key):
+    """Single Groq analysis request; caches successful answers."""
+    user_content = GROQ_USER_TEMPLATE.format(company=company_name, snippets=raw_data)
+
+    result = await groq_json_completion(GROQ_SYSTEM_PROMPT, user_content)
+    if result is None:
+        return {"Annual Revenue": "Not Found", "Total Employee Count": "Not Found"}
+
+    GROQ_ANALYSIS_CACHE.set(cache_key, result)
+    return result
+
+# Fast path: many snippets state the answer outright ("₹275 Cr", "402 employees")
+INR_REVENUE_RE = re.compile(
+    r"(?:₹\s*|\bRs\.?\s*|\bINR\s*)(\d{1,5}(?:[.,]\d+)?)\s*(crores?|cr|million|mn|billion|bn)\b",
+    re.IGNORECASE
+)
+# Lookbehind rejects ranges ("201-500 employees") and partial numbers
+EMPLOYEE_COUNT_RE = re.compile(
+    r"(?<![\d,.\-–])(\d{1,3}(?:,\d{3})+|\d{2,6})\s+(?:employees|staff|team members)\b",
+    re.IGNORECASE
+)
+# Everything is reported in crore, the INR unit the app's normalize_revenue parses
+CRORES_PER_UNIT = {"crore": 1, "crores": 1, "cr": 1, "million": 0.1, "mn": 0.1, "billion": 100, "bn": 100}
+# The prompt's PRIORITY 1 is an INR figure for FY24/25
+FY_24_25_RE = re.compile(r"\bFY\s*'?(?:20)?2[45]\b|\b2024\s*[-–/]\s*(?:20)?25\b", re.IGNORECASE)
+SNIPPET_SEPARATOR = "-" * 10
+
+def quick_extract_financials(raw_data):
+    """
+    Returns the result without Groq when the FY24/25 snippets agree on exactly
+    one INR revenue figure and all snippets on exactly one employee count;
+    otherwise None.
+    """
+    revenues = set()
+    for snippet in raw_data.split(SNIPPET_SEPARATOR):
+        if not FY_24_25_RE.search(snippet):
+            continue
+        for amount, unit in INR_REVENUE_RE.findall(snippet):
+            crores = float(amount.replace(",", "")) * CRORES_PER_UNIT[unit.lower()]
+            revenues.add(f"₹{round(crores, 2):g} Cr")
+    if len(revenues) != 1:
+        return None
+
+    employees = {int(count.replace(",", "")) for count in EMPLOYEE_COUNT_RE.findall(raw_data)}
+    if len(employees) != 1:
+        return None
+
+    return {"Annual Revenue": revenues.pop(), "Total Employee Count": employees.pop()}
+
+def make_groq_batches(items):
+    """Splits [(company, raw_data)] into batches by GROQ_BATCH_SIZE / GROQ_BATCH_MAX_CHARS."""
+    batches, batch, batch_chars = [], [], 0
+    for company, raw_data in items:
+        if batch and (len(batch) >= GROQ_BATCH_SIZE or batch_chars + len(raw_data) > GROQ_BATCH_MAX_CHARS):
+            batches.append(batch)
+            batch, batch_chars = [], 0
+        batch.append((company, raw_data))
+        batch_chars += len(raw_data)
+    if batch:
+        batches.append(batch)
+    return batches
+
+async def analyze_batch_with_groq(batch):
+    """
+    Analyzes several (company, raw_data) pairs in one Groq request.
+    Companies missing from a valid answer (or a failed request) fall back to
+    analyze_with_groq one by one. Returns {company: result}.
+    """
+    results = {}
+    pending = []
+    for company, raw_data in batch:
+        cached = GROQ_ANALYSIS_CACHE.get(analysis_cache_key(company, raw_data))
+        if cached is not None:
+            print(f"      💾 Using cached Groq analysis for {company}.")
+            results[company] = cached
+        else:
+            pending.append((company, raw_data))
+
+    if len(pending) > 1:
+        print(f"   🧠 Analyzing {len(pending)} companies in one Groq request...")
+        user_content = "Companies:\n" + json.dumps(
+            [{"company": company, "snippets": raw_data} for company, raw_data in pending],
+            ensure_ascii=False
+        )
+        answer = await groq_json_completion(GROQ_BATCH_SYSTEM_PROMPT, user_content)
+
+        analyses = []
+        if answer is not None:
+            try:
+                analyses = BatchAnalysis.model_validate(answer).results
+            except ValidationError as e:
+                print(f"      ⚠️ Batch answer rejected: {e.error_count()} validation errors")
+
+        by_name = {a.company.strip().lower(): a for a in analyses}
+        leftovers = []
+        for company, raw_data in pending:
+            analysis = by_name.get(company.strip().lower())
+            if analysis is None:
+                leftovers.append((company, raw_data))
+                continue
+            result = analysis.model_dump(by_alias=True, exclude={"company"})
+            GROQ_ANALYSIS_CACHE.set(analysis_cache_key(company, raw_data), result)
+            results[company] = result
+        pending = leftovers
+
+    # Single-company requests for whatever the batch could not answer
+    for company, raw_data in pending:
+        print(f"      🧠 Analyzing {company} with Groq...")
+        results[company] = await analyze_with_groq(company, raw_data)
+
+    return results
 
 # ==========================================
 # 🟢 5. MAIN LOGIC LOOP
 # ==========================================
  
-def main():
-    # 1. Load existing data (Resume capability)
-    final_data = {}
-    if os.path.exists(FINAL_OUTPUT_FILE):
-        try:
-            with open(FINAL_OUTPUT_FILE, "r", encoding="utf-8") as f:
-                final_data = json.load(f)
-        except:
-            pass
- 
-    # 2. Calculate dynamic previous year (e.g., 2025)
-    current_year = datetime.datetime.now().year
-    prev_year = current_year - 1
- 
-    print(f"🚀 Starting Extraction for {len(TARGET_COMPANIES)} Companies...")
-    print(f"📅 Target Revenue Year: {prev_year}\n")
- 
-    for i, company in enumerate(TARGET_COMPANIES):
+class DdgThrottle:
+    """
+    Shapes DuckDuckGo traffic before it gets blocked: caps in-flight requests
+    and spaces request starts with jitter. A block rate above 5% halves the
+    concurrency and doubles the delay; a minute under 1% adds one slot back.
+    """
+
+    def __init__(self):
+        self.limit = DDG_START_CONCURRENCY
+        self.delay = DDG_BASE_DELAY
+        self.active = 0
+        self.next_start = 0.0
+        self.outcomes = deque()  # (timestamp, was_blocked)
+        self.last_change = time.monotonic()
+        self.cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.delay * random.uniform(0.5, 1.5)
+
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def __aexit__(self, *exc_info):
+        async with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
+
+    def record(self, blocked):
+        now = time.monotonic()
+        self.outcomes.append((now, blocked))
+        while now - self.outcomes[0][0] > DDG_RATE_WINDOW:
+            self.outcomes.popleft()
+
+        block_rate = sum(b for _, b in self.outcomes) / len(self.outcomes)
+
+        if blocked and block_rate > 0.05:
+            self.limit = max(1, self.limit // 2)
+            self.delay = min(self.delay * 2, DDG_MAX_DELAY)
+            self.last_change = now
+            print(f"      🐢 DDG block rate {block_rate:.0%}: {self.limit} in flight, {self.delay:.0f}s apart")
+        elif block_rate < 0.01 and now - self.last_change >= DDG_RATE_WINDOW:
+            if self.limit < DDG_MAX_CONCURRENCY or self.delay > DDG_BASE_DELAY:
+                self.limit = min(DDG_MAX_CONCURRENCY, self.limit + 1)
+                self.delay = max(DDG_BASE_DELAY, self.delay / 2)
+                print(f"      🐇 DDG quiet: {self.limit} in flight, {self.delay:.0f}s apart")
+            self.last_change = now
+
+async def search_with_retry(session, ddg_throttle, query_text, time_filter):
+    """search_ddg with the block/empty retry loop; returns snippets or None."""
+    snippet_text = None
+   
+    # Retry Loop (If blocked)
+    for attempt in range(3):
+        async with ddg_throttle:
+            snippet_text = await search_ddg(session, query_text, time_filter)
+        ddg_throttle.record(snippet_text == "BLOCK")
        
-        # Skip if already done
-        if company in final_data:
-            print(f"⏭️  Skipping {company} (Already Done)")
+        if snippet_text == "BLOCK":
+            # The throttle has already slowed down; the retry waits for its next slot
+            print(f"      🛑 Blocked! Retrying at a slower pace...")
+            snippet_text = None
             continue
- 
-        print(f"[{i+1}/{len(TARGET_COMPANIES)}] 🏢 Processing: {company}")
+       
+        if snippet_text: break
+        await asyncio.sleep(2) # Short wait between retries
+
+    return snippet_text
+
+async def process_company(session, sem, ddg_throttle, company, position, total, prev_year):
+    """Runs both searches for one company; returns the combined snippets ("" if none)."""
+    async with sem:
+        print(f"[{position}/{total}] 🏢 Processing: {company}")
        
         # 🟢 DEFINING THE 2 SPECIFIC QUERIES
         # Q1: Employee focus (RocketReach)
@@ -225,65 +553,110 @@ def main():
             }
         ]
  
-        full_raw_data = ""
+        raw_parts = []
  
-        # 🟢 RUNNING BOTH QUERIES ONE BY ONE
-        for q in queries:
+        # 🟢 RUNNING BOTH QUERIES TOGETHER (ddg_throttle keeps DDG traffic polite)
+        snippets = await asyncio.gather(
+            *[search_with_retry(session, ddg_throttle, q["text"], q["filter"]) for q in queries],
+            return_exceptions=True
+        )
+
+        for q, snippet_text in zip(queries, snippets):
             query_text = q["text"]
-            time_filter = q["filter"]
-           
-            snippet_text = None
-           
-            # Retry Loop (If blocked)
-            for attempt in range(3):
-                snippet_text = search_ddg(query_text, time_filter)
-               
-                if snippet_text == "BLOCK":
-                    wait = random.uniform(30, 60)
-                    print(f"      🛑 Blocked! Sleeping {wait:.1f}s...")
-                    time.sleep(wait)
-                    continue
-               
-                if snippet_text: break
-                time.sleep(2) # Short wait between retries
+            if isinstance(snippet_text, Exception):
+                print(f"      ⚠️ Search failed: {snippet_text}")
+                snippet_text = None
            
             if snippet_text:
                 # Add result to our data pile
-                full_raw_data += f"\nQUERY: {query_text}\n{snippet_text}\n"
+                raw_parts.append(f"\nQUERY: {query_text}\n{snippet_text}\n")
                 save_raw_log(company, query_text, snippet_text)
             else:
                 print(f"      🔸 No data found for query.")
  
-            # ⏳ DELAY BETWEEN QUERIES (Safe Time)
-            delay = random.uniform(5, 8)
-            print(f"      ⏳ Waiting {delay:.1f}s...")
-            time.sleep(delay)
+        cooldown = random.uniform(10, 15)
+        print(f"[SLEEP] Cooling down for {cooldown:.1f}s before next company...\n")
+        await asyncio.sleep(cooldown)
+
+    return "".join(raw_parts)
+
+async def main():
+    # 1. Load existing data (Resume capability)
+    final_data = load_final_data()
+    # Start from a clean log (a crashed run may have left a partial last line).
+    # Only when there is one: rewriting the JSON bumps its mtime, which the
+    # app's intel caches are keyed on
+    if os.path.exists(FINAL_OUTPUT_LOG):
+        compact_final_data(final_data)
  
-        # 🟢 FINAL ANALYSIS
-        if full_raw_data.strip():
-            print(f"      🧠 Analyzing with Groq...")
-            result = analyze_with_groq(company, full_raw_data)
-            print(f"      ✅ RESULT: {json.dumps(result)}")
-           
-            # Save Data
-            final_data[company] = result
-            save_json(final_data)
+    # 2. Calculate dynamic previous year (e.g., 2025)
+    current_year = datetime.datetime.now().year
+    prev_year = current_year - 1
+ 
+    print(f"🚀 Starting Extraction for {len(TARGET_COMPANIES)} Companies...")
+    print(f"📅 Target Revenue Year: {prev_year}\n")
+ 
+    todo = []
+    for company in TARGET_COMPANIES:
+        # Skip if already done
+        if company in final_data:
+            print(f"⏭️  Skipping {company} (Already Done)")
         else:
-            print(f"      ❌ NO DATA extracted.")
+            todo.append(company)
+
+    # 🟢 PHASE 1: SCRAPING (overlap up to COMPANY_CONCURRENCY companies at once)
+    sem = asyncio.Semaphore(COMPANY_CONCURRENCY)
+    ddg_throttle = DdgThrottle()
+    async with aiohttp.ClientSession() as session:
+        scraped = await asyncio.gather(
+            *[
+                process_company(session, sem, ddg_throttle, company, i + 1, len(todo), prev_year)
+                for i, company in enumerate(todo)
+            ],
+            return_exceptions=True
+        )
+
+    to_analyze = []
+    for company, outcome in zip(todo, scraped):
+        if isinstance(outcome, Exception):
+            print(f"❌ Failed extraction for {company}: {outcome}")
+        elif outcome.strip():
+            to_analyze.append((company, outcome))
+        else:
+            print(f"      ❌ NO DATA extracted for {company}.")
             final_data[company] = {"Annual Revenue": "Not Found", "Total Employee Count": "Not Found"}
-            save_json(final_data)
- 
-        cooldown = random.uniform(10, 15)
-        print(f"[SLEEP] Cooling down for {cooldown:.1f}s before next company...\n")
-        time.sleep(cooldown)
+            append_result(company, final_data[company])
+
+    # 🟢 PHASE 2: FINAL ANALYSIS
+    # Unambiguous snippets are answered by regex, the rest go to Groq in batches
+    needs_groq = []
+    for company, raw_data in to_analyze:
+        result = quick_extract_financials(raw_data)
+        if result is None:
+            needs_groq.append((company, raw_data))
+            continue
+        print(f"      ⚡ {company} (regex): {json.dumps(result)}")
+        final_data[company] = result
+        append_result(company, result)
+
+    try:
+        for batch in make_groq_batches(needs_groq):
+            results = await analyze_batch_with_groq(batch)
+            for company, result in results.items():
+                print(f"      ✅ {company}: {json.dumps(result)}")
+                final_data[company] = result
+                append_result(company, result)
+    finally:
+        # The shared HTTP/2 pool is bound to this asyncio.run's loop
+        await close_groq_clients()
+
+    # The log only exists again if append_result ran, i.e. something new was found
+    if os.path.exists(FINAL_OUTPUT_LOG):
+        compact_final_data(final_data)
  
     print("\n🎉 All Done! Check Final_Company_Data.json")
 
 def enrich_companies_from_list(company_list):
     global TARGET_COMPANIES
     TARGET_COMPANIES = list(set(company_list))
-    main()
-
-
-
-
+    asyncio.run(main())
\ No newline at end of file
@@ -1,11 +1,14 @@
 
 import os
+import re
 import json
-import time
+import asyncio
 from datetime import datetime
-from langchain_community.tools.tavily_search import TavilySearchResults # Updated import standard
-# If using the older package, use: from langchain_tavily import TavilySearch
+from urllib.parse import urlparse
+from tavily import AsyncTavilyClient
 from dotenv import load_dotenv
+from request_cache import InFlight, JsonCache, make_cache_key
+from shared_utils import get_api_keys, orjson
 
 # Load environment variables
 load_dotenv()
@@ -14,32 +17,15 @@ load_dotenv()
 # CONFIGURATION
 # ==========================================
 
-# --- 🔑 DYNAMIC KEY LOADER FOR TAVILY ---
-def get_api_keys(prefix):
-    """
-    Finds all env variables starting with PREFIX_ (e.g., TAVILY_API_KEY_1)
-    Returns a list of keys.
-    """
-    keys = []
-    i = 1
-    while True:
-        key = os.getenv(f"{prefix}_{i}")
-        if key:
-            keys.append(key)
-            i += 1
-        else:
-            break
-    # Fallback: Check for plain key
-    if not keys and os.getenv(prefix):
-        keys.append(os.getenv(prefix))
-    return keys
-
 # Load all Tavily keys
 TAVILY_KEYS = get_api_keys("TAVILY_API_KEY")
 
 if not TAVILY_KEYS:
     print("❌ CRITICAL: No TAVILY_API_KEYs found in .env file!")
 
+# One client per key, created once (no env mutation / tool re-init per search)
+TAVILY_CLIENTS = [AsyncTavilyClient(api_key=key) for key in TAVILY_KEYS]
+
 
 # Domains focused on SMEs, Startups, and Professional Updates
 TARGET_DOMAINS = [
@@ -47,39 +33,79 @@ TARGET_DOMAINS = [
     "g2.com", "yourstory.com", "inc42.com", "entrackr.com",
     "medium.com", "prlog.org", "businesswire.com", "finance.yahoo.com"
 ]
+_TARGET_DOMAIN_SET = frozenset(TARGET_DOMAINS)
+
+def is_target_domain(host):
+    """True if host is a target domain or a subdomain of one (www.linkedin.com)."""
+    labels = host.split(".")
+    return any(".".join(labels[i:]) in _TARGET_DOMAIN_SET for i in range(len(labels) - 1))
+
+# Raw page content is large, so search results are kept on disk only (7 day max age)
+TAVILY_CACHE = JsonCache("tavily_search", keep_in_memory=False)
+# Identical searches running at the same time share one Tavily request
+TAVILY_INFLIGHT = InFlight()
+
+# Companies researched at the same time (each one runs 2 Tavily searches)
+RESEARCH_CONCURRENCY = 4
+RESEARCH_DELAY = 5  # seconds a slot waits after each report
 
 # ==========================================
 # ROTATION WRAPPER
 # ==========================================
 
-def run_tavily_with_retry(query, max_results=5, domains=None):
+def clean_tavily_results(response):
+    """Keeps the fields the reports use from a raw Tavily search response."""
+    results = []
+    for item in response.get("results", []):
+        result = {
+            "title": item.get("title", ""),
+            "url": item.get("url", ""),
+            "content": item.get("content", ""),
+            "score": item.get("score"),
+        }
+        if item.get("raw_content"):
+            result["raw_content"] = item["raw_content"]
+        results.append(result)
+    return results
+
+async def run_tavily_with_retry(query, max_results=5, domains=None, raw_content=True):
     """
     Executes Tavily search with automatic key rotation.
+    raw_content=False skips full page text when only the snippets are used.
     """
-    tool_args = {
+    search_args = {
         "max_results": max_results,
         "search_depth": "advanced",
-        "include_answer": True,
-        "include_raw_content": True
+        "include_raw_content": raw_content
     }
     if domains:
-        tool_args["include_domains"] = domains
+        search_args["include_domains"] = domains
 
-    for index, api_key in enumerate(TAVILY_KEYS):
+    cache_key = make_cache_key(query, json.dumps(search_args, sort_keys=True))
+    cached = TAVILY_CACHE.get(cache_key)
+    if cached is not None:
+        print("      💾 Using cached Tavily results.")
+        return cached
+
+    return await TAVILY_INFLIGHT.run(
+        cache_key, lambda: search_with_key_rotation(query, search_args, cache_key)
+    )
+
+async def search_with_key_rotation(query, search_args, cache_key):
+    for index, client in enumerate(TAVILY_CLIENTS):
         try:
-            # Set Key
-            os.environ["TAVILY_API_KEY"] = api_key
-            
-            # Re-initialize tool
-            tool = TavilySearchResults(**tool_args)
-            
-            return tool.invoke(query)
+            response = await client.search(query, **search_args)
+            results = clean_tavily_results(response)
+            # Only cache real result lists, never errors or empty answers
+            if results:
+                TAVILY_CACHE.set(cache_key, results)
+            return results
 
         except Exception as e:
             print(f"      ⚠️ Tavily Key {index+1} Failed: {e}")
-            if index < len(TAVILY_KEYS) - 1:
+            if index < len(TAVILY_CLIENTS) - 1:
                 print("      🔄 Switching to next Tavily Key...")
-                time.sleep(10)
+                await asyncio.sleep(10)
             else:
                 print("      ❌ All Tavily Keys exhausted.")
                 return []
@@ -89,7 +115,7 @@ def run_tavily_with_retry(query, max_results=5, domains=None):
 # DATA FETCHING
 # ==========================================
 
-def fetch_financial_data(company_name):
+async def fetch_financial_data(company_name):
     """
     Fetches core financial details, funding, and registration info.
     Uses a 'general' search depth for broad coverage.
@@ -107,9 +133,9 @@ def fetch_financial_data(company_name):
     """
     
     # Use Wrapper instead of direct call
-    return run_tavily_with_retry(query, max_results=20)
+    return await run_tavily_with_retry(query, max_results=20)
     
-def fetch_company_news(company_name):
+async def fetch_company_news(company_name):
     """
     Fetches recent news, PR, and hiring updates from specific professional domains.
     Includes logic to filter out irrelevant search noise.
@@ -123,28 +149,32 @@ def fetch_company_news(company_name):
     3. Investment news or leadership changes.
     """
 
-    # Use Wrapper with domains
-    raw_results = run_tavily_with_retry(query, max_results=10, domains=TARGET_DOMAINS)
+    # Use Wrapper with domains (only the snippets are kept, so no raw page content)
+    raw_results = await run_tavily_with_retry(
+        query, max_results=10, domains=TARGET_DOMAINS, raw_content=False
+    )
     
     verified_sources = []
     
     try:
         # --- FILTERING LOGIC ---
         # Ensure the company name actually appears in the title or snippet
-        short_name = company_name.split()[0].lower() # e.g., "AnavClouds"
+        short_name = company_name.split()[0] # e.g., "AnavClouds"
+        # Case-insensitive search, no lowercased copy of every (large) content
+        short_name_re = re.compile(re.escape(short_name), re.IGNORECASE)
         
         for item in raw_results:
-            title = item.get('content', '').lower() # Tavily sometimes puts title in content, check structure
-            snippet = item.get('content', '').lower()
+            content = item.get('content', '') # Tavily sometimes puts title in content, check structure
             url = item.get('url', '')
+            host = urlparse(url).netloc
 
-            # Validation: Short name must exist in the content snippet to be relevant
-            if short_name in snippet or short_name in title:
+            # Validation: must come from a target domain and mention the short name
+            if is_target_domain(host.lower()) and short_name_re.search(content):
                 verified_sources.append({
                     "title": url.split('/')[-1].replace('-', ' ').title(), # Fallback title from URL
                     "url": url,
-                    "snippet": item.get('content', '')[:300] + "...",
-                    "source_domain": url.split('/')[2]
+                    "snippet": content[:300] + "...",
+                    "source_domain": host
                 })
                 
         print(f"    -> {len(raw_results)} raw results found.")
@@ -156,31 +186,28 @@ def fetch_company_news(company_name):
         print(f"[!] Error fetching news: {str(e)}")
         return []
 
-def generate_report(company_name):
+def to_json_bytes(obj):
+    # Reports carry full raw page content (often MBs), orjson encodes it much faster
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+def write_json_items(f, items):
+    """Writes the items of a JSON array one by one (no full-payload string in memory)."""
+    for i, item in enumerate(items):
+        if i:
+            f.write(b",\n")
+        f.write(to_json_bytes(item))
+
+async def generate_report(company_name):
     """
     Main orchestrator function.
-    Aggregates data and saves to JSON.
+    Aggregates data and streams it to JSON section by section.
     """
     print(f"\n{'='*60}")
     print(f"STARTING ANALYSIS: {company_name.upper()}")
     print(f"{'='*60}\n")
     
-    # 1. Gather Data
-    financial_data = fetch_financial_data(company_name)
-    news_data = fetch_company_news(company_name)
-    
-    # 2. Structure Data for JSON
-    report_payload = {
-        "meta": {
-            "company_name": company_name,
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "status": "Success"
-        },
-        "financial_intelligence": financial_data,
-        "market_updates": news_data
-    }
-    
-    # 3. Save to JSON
     # Create folder if it doesn't exist
     output_dir = "Unstructured_data"
     os.makedirs(output_dir, exist_ok=True)
@@ -190,23 +217,64 @@ def generate_report(company_name):
         output_dir,
         f"{company_name.replace(' ', '_')}_Report.json"
     )
+    tmp_filename = filename + ".tmp"
+    news_task = None
 
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(report_payload, f, indent=4, ensure_ascii=False)
+        # 1. Gather Data (news search runs while the financial section is written)
+        news_task = asyncio.create_task(fetch_company_news(company_name))
+        financial_data = await fetch_financial_data(company_name)
+
+        meta = {
+            "company_name": company_name,
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "status": "Success"
+        }
+
+        # 2. Save to JSON
+        # Same layout as the old single dump: {"meta", "financial_intelligence", "market_updates"}
+        with open(tmp_filename, "wb") as f:
+            f.write(b'{\n"meta": ' + to_json_bytes(meta) + b',\n"financial_intelligence": [\n')
+            write_json_items(f, financial_data)
+            del financial_data
+
+            f.write(b'\n],\n"market_updates": [\n')
+            write_json_items(f, await news_task)
+            f.write(b"\n]\n}\n")
+
+        # Readers only ever see a complete report
+        os.replace(tmp_filename, filename)
         print(f"\n[+] Data successfully exported to: {filename}")
     except IOError as e:
         print(f"[!] File Save Error: {e}")
+    finally:
+        if news_task is not None and not news_task.done():
+            news_task.cancel()
+        # Any failure before os.replace leaves a partial report behind
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
 
 # ==========================================
 # ENTRY POINT
 # ==========================================
 
 
-def run_deep_research_for_companies(company_list):
-    for company in company_list:
+async def research_company(sem, company):
+    async with sem:
         try:
-            generate_report(company)
-            time.sleep(5)  # polite delay
+            await generate_report(company)
         except Exception as e:
             print(f"❌ Failed research for {company}: {e}")
+        # Polite delay, taken while still holding the slot so the overall
+        # Tavily request rate stays bounded
+        await asyncio.sleep(RESEARCH_DELAY)
+
+async def research_companies(company_list):
+    # Up to RESEARCH_CONCURRENCY reports in flight instead of one at a time
+    sem = asyncio.Semaphore(RESEARCH_CONCURRENCY)
+    await asyncio.gather(*[research_company(sem, company) for company in company_list])
+
+def run_deep_research_for_companies(company_list):
+    # Same company twice in one run would repeat every Tavily query (order kept)
+    unique_companies = list(dict.fromkeys(c.strip() for c in company_list if c and c.strip()))
+    asyncio.run(research_companies(unique_companies))
@@ -0,0 +1,47 @@
+# ============================================================
+# SHARED GROQ CLIENTS (one HTTP/2 pool per event loop)
+# ============================================================
+
+import asyncio
+
+import httpx
+from groq import AsyncGroq
+
+# One AsyncGroq per (key, timeout), reused across calls, all sharing one HTTP/2
+# connection pool so concurrent requests multiplex over the same TLS connection.
+# The pool is tied to the event loop it first ran on, so it is rebuilt when a
+# new asyncio.run starts; close_groq_clients() releases it at the end of a run.
+GROQ_CLIENTS = {}
+_groq_clients_loop = None
+_groq_http_client = None
+
+
+def get_groq_client(api_key, timeout=60.0):
+    global _groq_clients_loop, _groq_http_client
+    loop = asyncio.get_running_loop()
+    if loop is not _groq_clients_loop:
+        GROQ_CLIENTS.clear()
+        _groq_clients_loop = loop
+        _groq_http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=timeout
+        )
+
+    client = GROQ_CLIENTS.get((api_key, timeout))
+    if client is None:
+        # The per-client timeout applies to every request, whichever caller built the pool
+        client = GROQ_CLIENTS[(api_key, timeout)] = AsyncGroq(
+            api_key=api_key, http_client=_groq_http_client, timeout=timeout
+        )
+    return client
+
+
+async def close_groq_clients():
+    """Closes the shared HTTP pool at the end of the asyncio.run that created it."""
+    global _groq_clients_loop, _groq_http_client
+    if _groq_http_client is not None:
+        await _groq_http_client.aclose()
+    GROQ_CLIENTS.clear()
+    _groq_clients_loop = None
+    _groq_http_client = None
@@ -1,12 +1,15 @@
 import time
 import os
 import sys
-import pandas as pd
+import asyncio
+from collections import deque
 from dotenv import load_dotenv
-from groq import Groq
 import gspread
 from google.oauth2.service_account import Credentials
 import json
+from shared_utils import get_api_keys, orjson
+from groq_clients import close_groq_clients, get_groq_client
+from request_cache import JsonCache, make_cache_key
 
 # --- 1. SETUP & CONFIGURATION ---
 
@@ -14,25 +17,6 @@ import json
 load_dotenv()
 
 # --- 🔄 CHANGE 1: DYNAMIC KEY LOADING ---
-def get_api_keys(prefix):
-    """
-    Finds all env variables starting with PREFIX_ (e.g., GROQ_API_KEY_1)
-    Returns a list of keys.
-    """
-    keys = []
-    i = 1
-    while True:
-        key = os.getenv(f"{prefix}_{i}")
-        if key:
-            keys.append(key)
-            i += 1
-        else:
-            break
-    # Fallback: Check for plain key
-    if not keys and os.getenv(prefix):
-        keys.append(os.getenv(prefix))
-    return keys
-
 # Load all Groq keys
 GROQ_KEYS = get_api_keys("GROQ_API_KEY")
 
@@ -43,6 +27,37 @@ if not GROQ_KEYS:
     else:
         raise ValueError("[CRITICAL ERROR] No GROQ_API_KEYs found in .env file")
 
+# --- ⚡ GROQ THROUGHPUT BUDGET ---
+# Rows are independent, so several summaries run at once, spread round-robin
+# over the keys. Each key's limiter keeps it inside the per-minute
+# request/token budget of the Groq plan.
+GROQ_CONCURRENCY_PER_KEY = 4
+GROQ_RPM_LIMIT = 30
+GROQ_TPM_LIMIT = 12000
+SUMMARY_MAX_TOKENS = 120  # Two sentences; also counted against the token budget
+
+# A key that hits a rate limit / server error is skipped by every row for a while
+GROQ_KEY_COOLDOWN = 60
+GROQ_KEY_COOLDOWN_UNTIL = {}  # key index -> time.time() when it may be used again
+
+# News characters included in each lead prompt
+NEWS_PROMPT_CHARS = 300
+
+# One progress line per this many finished summaries (instead of a line per row)
+PROGRESS_EVERY = 10
+
+# Finished cells are sent to Sheets in batches of this size
+SHEET_FLUSH_EVERY = 100
+
+# The summary is template filling, so the small model handles most rows.
+# Low-scoring rows (weak / ambiguous data) go to the larger model instead.
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+STRICT_SUMMARY_MODEL = "llama-3.3-70b-versatile"
+STRICT_MODE_BELOW_SCORE = 5
+
+# Re-runs (failed rows, partially filled sheets) reuse the stored summary
+SUMMARY_CACHE = JsonCache("lead_summaries")
+
 # Import Sheet Name
 try:
     from upload_to_sheets import GOOGLE_SHEET_NAME
@@ -65,7 +80,11 @@ def connect_to_sheet():
     ]
 
     try:
-        service_account_info = json.loads(os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON"))
+        # Env var read once above; orjson parses the blob when installed
+        if orjson is not None:
+            service_account_info = orjson.loads(SERVICE_ACCOUNT_FILE)
+        else:
+            service_account_info = json.loads(SERVICE_ACCOUNT_FILE)
         creds = Credentials.from_service_account_info(service_account_info, scopes=scopes)
         gc = gspread.authorize(creds)
         return gc
@@ -76,9 +95,104 @@ def connect_to_sheet():
 
 # --- 3. THE AI BRAIN (Strategic Analysis) ---
 
-def generate_smart_summary(row_data):
+GROQ_TIMEOUT = 30.0  # seconds per request (shared client pool lives in groq_clients.py)
+
+class SlidingWindowLimiter:
+    """
+    Tracks (timestamp, tokens) of the requests sent in the last `window`
+    seconds and waits until a new request fits both the RPM and TPM budget.
+    """
+
+    def __init__(self, max_requests, max_tokens, window=60.0):
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.window = window
+        self.events = deque()
+        self.tokens_in_window = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.events and now - self.events[0][0] >= self.window:
+                    _, old_tokens = self.events.popleft()
+                    self.tokens_in_window -= old_tokens
+
+                fits = (
+                    len(self.events) < self.max_requests
+                    and self.tokens_in_window + tokens <= self.max_tokens
+                )
+                # An empty window always admits one request, even an oversized one
+                if fits or not self.events:
+                    self.events.append((now, tokens))
+                    self.tokens_in_window += tokens
+                    return
+
+                await asyncio.sleep(self.window - (now - self.events[0][0]))
+
+def estimate_tokens(prompt):
+    """Rough prompt size (~4 chars per token) plus the reply allowance."""
+    return len(prompt) // 4 + SUMMARY_MAX_TOKENS
+
+def needs_strict_mode(score):
+    """True for numeric scores below STRICT_MODE_BELOW_SCORE ("N/A" etc. stay on the small model)."""
+    try:
+        return float(score) < STRICT_MODE_BELOW_SCORE
+    except (TypeError, ValueError):
+        return False
+
+# --- Intelligent Prompt ---
+# Identical for every row, so it is built once and sent as the system message
+SUMMARY_SYSTEM_PROMPT = """
+Act as a Strategic Sales Director for a boutique Salesforce/IT Agency.
+Our ideal 'Dream Clients' are **Small-to-Mid Sized Companies** (Agile, Fast Decisions).
+We also target Enterprises, but view them as long-term plays.
+
+**CLASSIFICATION & STRATEGY RULES:**
+1. **Mid-Market (The Sweet Spot):** (Revenue $10M-$1B OR 50-1000 Emp).
+   -> LABEL: "🌟 DREAM CLIENT (Mid-Market)"
+   -> STRATEGY: Pitch "End-to-End Automation & Scaling". They need speed.
+
+2. **Small Business:** (Revenue < $10M OR < 50 Emp).
+   -> LABEL: "🚀 HIGH POTENTIAL (SMB)"
+   -> STRATEGY: Pitch "We become your Tech Team". They lack internal resources.
+
+3. **Enterprise:** (Revenue > $1B OR > 1000 Emp).
+   -> LABEL: "🏢 ENTERPRISE (Big Ticket)"
+   -> STRATEGY: Pitch "Specialized Staff Augmentation / Niche Consulting". (Note: Longer sales cycle).
+
+4. **Funded Startup:** (Any size with recent funding news).
+   -> LABEL: "🔥 HOT LEAD (Funded)"
+   -> STRATEGY: Pitch "Rapid Deployment for Growth".
+
+**YOUR TASK:**
+Write a 2-sentence summary for the lead you are given, following this strict format:
+
+"[LABEL] - Score [score]/15. [Why they fit our agency]. [Killer Pitch]."
+
+**Examples:**
+- "🌟 DREAM CLIENT (Mid-Market) - Score 12/15. Perfect fit as they are scaling fast ($50M Rev) and need to automate chaos. Pitch our 'Salesforce Growth Package' for immediate impact."
+- "🏢 ENTERPRISE (Big Ticket) - Score 15/15. Massive scale ($1B+) means high reliability needs. Pitch 'Dedicated Support Teams' to assist their internal IT dept."
+""".strip()
+
+# Only the per-lead slots are formatted on each call
+SUMMARY_USER_TEMPLATE = """
+**Lead Profile:**
+- Company: {company} ({industry})
+- Score: {score} / 100
+- Details: {breakout}
+- Data: {employees} Employees | Revenue: {revenue}
+- News Signals: {news}
+
+Start the summary with: "[LABEL] - Score {score}/15."
+""".strip()
+
+async def generate_smart_summary(row_data, clients, limiters, first_key=0, strict_mode=False):
     """
     Reads the full row data and generates a strategic summary.
+    Starts on clients[first_key] and rotates through the others on failure.
+    strict_mode=True uses the larger model for low-confidence rows.
     """
     # --- Data Extraction ---
     company = row_data.get("company_profile_company_name", row_data.get("Company", "Unknown"))
@@ -99,73 +213,171 @@ def generate_smart_summary(row_data):
         or "No details"
     )
 
-    news_data = row_data.get("news", "")
-    
-    # --- Intelligent Prompt ---
-    prompt = f"""
-    Act as a Strategic Sales Director for a boutique Salesforce/IT Agency.
-    Our ideal 'Dream Clients' are **Small-to-Mid Sized Companies** (Agile, Fast Decisions).
-    We also target Enterprises, but view them as long-term plays.
-
-    **Lead Profile:**
-    - Company: {company} ({industry})
-    - Score: {score} / 100
-    - Details: {breakout}
-    - Data: {employees} Employees | Revenue: {revenue}
-    - News Signals: {news_data[:300]}
-
-    **CLASSIFICATION & STRATEGY RULES:**
-    1. **Mid-Market (The Sweet Spot):** (Revenue $10M-$1B OR 50-1000 Emp).
-       -> LABEL: "🌟 DREAM CLIENT (Mid-Market)"
-       -> STRATEGY: Pitch "End-to-End Automation & Scaling". They need speed.
+    news_data = row_data.get("news", "")  # Already cut to NEWS_PROMPT_CHARS at load
     
-    2. **Small Business:** (Revenue < $10M OR < 50 Emp).
-       -> LABEL: "🚀 HIGH POTENTIAL (SMB)"
-       -> STRATEGY: Pitch "We become your Tech Team". They lack internal resources.
-
-    3. **Enterprise:** (Revenue > $1B OR > 1000 Emp).
-       -> LABEL: "🏢 ENTERPRISE (Big Ticket)"
-       -> STRATEGY: Pitch "Specialized Staff Augmentation / Niche Consulting". (Note: Longer sales cycle).
-
-    4. **Funded Startup:** (Any size with recent funding news).
-       -> LABEL: "🔥 HOT LEAD (Funded)"
-       -> STRATEGY: Pitch "Rapid Deployment for Growth".
-
-    **YOUR TASK:**
-    Write a 2-sentence summary following this strict format:
-
-    "[LABEL] - Score {score}/15. [Why they fit our agency]. [Killer Pitch]."
+    # --- Intelligent Prompt (static rules live in the system message) ---
+    prompt = SUMMARY_USER_TEMPLATE.format(
+        company=company,
+        industry=industry,
+        score=score,
+        breakout=breakout,
+        employees=employees,
+        revenue=revenue,
+        news=news_data,
+    )
+    model = STRICT_SUMMARY_MODEL if strict_mode else SUMMARY_MODEL
 
-    **Examples:**
-    - "🌟 DREAM CLIENT (Mid-Market) - Score 12/15. Perfect fit as they are scaling fast ($50M Rev) and need to automate chaos. Pitch our 'Salesforce Growth Package' for immediate impact."
-    - "🏢 ENTERPRISE (Big Ticket) - Score 15/15. Massive scale ($1B+) means high reliability needs. Pitch 'Dedicated Support Teams' to assist their internal IT dept."
-    """
+    cache_key = make_cache_key(model, SUMMARY_SYSTEM_PROMPT, prompt)
+    cached = SUMMARY_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
 
     # --- 🔄 CHANGE 2: ROTATION LOGIC ---
-    for index, api_key in enumerate(GROQ_KEYS):
+    # Start at this row's key and skip keys that are cooling down after a failure
+    order = [(first_key + offset) % len(clients) for offset in range(len(clients))]
+    live = [index for index in order if GROQ_KEY_COOLDOWN_UNTIL.get(index, 0) <= time.time()]
+    if not live:
+        # Every key is cooling down: wait for the one that recovers first
+        index = min(order, key=lambda i: GROQ_KEY_COOLDOWN_UNTIL[i])
+        wait = GROQ_KEY_COOLDOWN_UNTIL[index] - time.time()
+        if wait > 0:
+            print(f"⏳ All Groq keys cooling down, waiting {wait:.0f}s...")
+            await asyncio.sleep(wait)
+        live = [index]
+
+    for attempt, index in enumerate(live):
         try:
-            # Initialize client with the current key inside loop
-            client = Groq(api_key=api_key)
-
-            chat_completion = client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.3-70b-versatile", 
-                temperature=0.5,
+            await limiters[index].acquire(estimate_tokens(SUMMARY_SYSTEM_PROMPT + prompt))
+            chat_completion = await clients[index].chat.completions.create(
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                model=model,
+                # Rule-driven labels: deterministic output keeps re-runs and the cache consistent
+                temperature=0,
+                seed=0,
+                max_tokens=SUMMARY_MAX_TOKENS,
             )
-            return chat_completion.choices[0].message.content.strip()
+            summary = chat_completion.choices[0].message.content.strip()
+            SUMMARY_CACHE.set(cache_key, summary)
+            return summary
     
         except Exception as e:
             print(f"⚠️ Groq Key {index+1} Failed for {company}: {e}")
+
+            # Rate limits, auth and server errors affect the key, not this row
+            status = getattr(e, "status_code", None)
+            if status is None or status in (401, 403, 429) or status >= 500:
+                GROQ_KEY_COOLDOWN_UNTIL[index] = time.time() + GROQ_KEY_COOLDOWN
             
             # Switch to next key if available
-            if index < len(GROQ_KEYS) - 1:
+            if attempt < len(live) - 1:
                 print("🔄 Switching to next API Key...")
-                time.sleep(1)
-            else:
-                return "Analysis Failed"
+
+    return "Analysis Failed"
 
 # --- 4. MAIN EXECUTION ---
 
+class SheetUpdateBuffer:
+    """
+    Collects finished cells and writes them with one batch_update per
+    SHEET_FLUSH_EVERY cells (plus a final flush) instead of update_cell per row.
+    """
+
+    def __init__(self, worksheet, flush_every=SHEET_FLUSH_EVERY):
+        self.worksheet = worksheet
+        self.flush_every = flush_every
+        self.pending = []
+        self.written = 0
+
+    def add(self, row, col, value):
+        """Only queues the cell; flushing is up to the caller."""
+        self.pending.append({
+            "range": gspread.utils.rowcol_to_a1(row, col),
+            "values": [[value]],
+        })
+
+    def flush_due(self):
+        return self.flush_every is not None and len(self.pending) >= self.flush_every
+
+    def _send(self, batch):
+        # RAW: model text is stored as-is, never parsed as a formula
+        self.worksheet.batch_update(batch, value_input_option="RAW")
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        try:
+            self._send(batch)
+        except Exception:
+            self.pending = batch + self.pending
+            raise
+        self.written += len(batch)
+
+    async def flush_async(self):
+        """
+        Periodic flush from inside the event loop: the HTTP call runs on a
+        worker thread so in-flight Groq requests keep going. Never raises; on
+        failure the cells stay queued for the final flush.
+        """
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        try:
+            await asyncio.to_thread(self._send, batch)
+        except Exception as e:
+            print(f"⚠️ Sheet update failed, retrying once all summaries are done: {e}")
+            self.pending = batch + self.pending
+            self.flush_every = None  # no more periodic flushes, only the final one
+            return
+        self.written += len(batch)
+
+async def summarize_rows(jobs, col_idx, updates):
+    """
+    Runs generate_smart_summary for every (index, row, company) job, assigning
+    keys round-robin with GROQ_CONCURRENCY_PER_KEY requests in flight per key,
+    and queues each finished cell.
+    """
+    clients = [get_groq_client(key, GROQ_TIMEOUT) for key in GROQ_KEYS]
+    limiters = [SlidingWindowLimiter(GROQ_RPM_LIMIT, GROQ_TPM_LIMIT) for _ in GROQ_KEYS]
+    sem = asyncio.Semaphore(len(GROQ_KEYS) * GROQ_CONCURRENCY_PER_KEY)
+    done = 0
+
+    print(f"🧠 Analyzing {len(jobs)} companies...")
+
+    async def summarize(job_no, index, row, company_name):
+        nonlocal done
+        async with sem:
+            score = row.get("lead_scoring_lead_score") or row.get("Lead Score")
+            summary = await generate_smart_summary(
+                row, clients, limiters,
+                first_key=job_no % len(clients),
+                strict_mode=needs_strict_mode(score)
+            )
+
+        # Row + 2 adjustment (header row + 1-based index)
+        updates.add(index + 2, col_idx, summary)
+        if updates.flush_due():
+            await updates.flush_async()
+
+        done += 1
+        if done % PROGRESS_EVERY == 0 or done == len(jobs):
+            print(f"   🧠 {done}/{len(jobs)} summaries generated")
+
+    try:
+        results = await asyncio.gather(
+            *(summarize(job_no, *job) for job_no, job in enumerate(jobs)),
+            return_exceptions=True
+        )
+    finally:
+        # The shared HTTP/2 pool is bound to this asyncio.run's loop
+        await close_groq_clients()
+    for (index, row, company_name), outcome in zip(jobs, results):
+        if isinstance(outcome, Exception):
+            print(f"❌ Failed to analyze {company_name}: {outcome}")
+
 def process_sheet_smartly():
     print(f"🔌 Connecting to Google Sheet: '{GOOGLE_SHEET_NAME}'...")
     
@@ -179,69 +391,81 @@ def process_sheet_smartly():
         print(f"❌ Could not open sheet '{GOOGLE_SHEET_NAME}': {e}")
         return
 
-    # Load Data into Pandas
-    all_data = worksheet.get_all_records()
-    df = pd.DataFrame(all_data)
+    # Load the sheet as one 2-D list of strings (no per-row dicts)
+    values = worksheet.get_values()
 
-    if df.empty:
+    if len(values) < 2:
         print("⚠️ Sheet is empty.")
         return
 
-    print(f"🚀 Found {len(df)} companies. Starting Strategic Analysis...")
+    header, rows = values[0], values[1:]
+    print(f"🚀 Found {len(rows)} companies. Starting Strategic Analysis...")
 
     output_col = "AI Strategic Summary"
-    updates_made = 0
-
-    for index, row in df.iterrows():
-        # Identify Company
-        company_name = row.get("company_profile_company_name", row.get("Company", "Unknown"))
-
-        # --- SKIP LOGIC ---
-        existing_summary = str(row.get(output_col, "")).strip()
 
+    # Resolve the output column from the header we already downloaded (no find() call)
+    if output_col in header:
+        col_idx = header.index(output_col) + 1
+    else:
+        print(f"➕ Adding new column: {output_col}")
+        col_idx = len(header) + 1
+        if worksheet.col_count < col_idx:
+            worksheet.add_cols(1)
+        worksheet.update_cell(1, col_idx, output_col)
+
+    # --- SKIP LOGIC (on the raw rows) ---
+    summary_i = col_idx - 1 if output_col in header else None
+    score_cols = [col for col in ("lead_scoring_lead_score", "Lead Score") if col in header]
+    score_idx = [header.index(col) for col in score_cols]
+
+    # Summaries are collected here and written with batch_update
+    updates = SheetUpdateBuffer(worksheet)
+    jobs = []
+
+    analyzed_count = no_score_count = 0
+    for index, row in enumerate(rows):
+        existing_summary = row[summary_i].strip() if summary_i is not None else ""
         is_failed_previous_run = any(x in existing_summary.lower() for x in ["analysis failed", "error", "failed to update"])
-       
         if len(existing_summary) > 10 and not is_failed_previous_run:
-            print(f"[SKIP] {company_name}: Already analyzed.")
+            analyzed_count += 1
             continue
-        
-        # 2. Skip if no Score (Cannot explain what doesn't exist)
-        score_val = (
-            row.get("lead_scoring_lead_score")
-            or row.get("Lead Score")
-        )
 
-        if not score_val:
-            print(f"⏭️  Skipping {company_name}: No Lead Score found.")
+        # 2. Skip if no Score (Cannot explain what doesn't exist); blank and "0" count as missing
+        if not any(gspread.utils.numericise(row[i]) for i in score_idx):
+            no_score_count += 1
             continue
 
+        # Only the rows that will be sent to Groq become dicts (index = sheet row - 2)
+        record = dict(zip(header, row))
 
-        # --- GENERATE & UPDATE ---
-        print(f"🧠 Analyzing {company_name}...")
-        summary = generate_smart_summary(row)
+        # Scores as numbers (for strict mode), other cells stay text
+        for col in score_cols:
+            record[col] = gspread.utils.numericise(record[col])
 
-        try:
-            # Find or Create Column
-            try:
-                col_idx = worksheet.find(output_col).col
-            except:
-                print(f"➕ Adding new column: {output_col}")
-                worksheet.add_cols(1)
-                new_col_idx = len(df.columns) + 1
-                worksheet.update_cell(1, new_col_idx, output_col)
-                col_idx = new_col_idx
-
-            # Update Cell (Row + 2 adjustment)
-            worksheet.update_cell(index + 2, col_idx, summary)
-            updates_made += 1
-            
-            # Rate Limit Safety
-            time.sleep(1.5)
+        # Only the start of the news blob goes into the prompt
+        if "news" in record:
+            record["news"] = record["news"][:NEWS_PROMPT_CHARS]
+
+        # Identify Company
+        company_name = record.get("company_profile_company_name", record.get("Company", "Unknown"))
+        jobs.append((index, record, company_name))
 
+    if analyzed_count:
+        print(f"[SKIP] {analyzed_count} companies already analyzed.")
+    if no_score_count:
+        print(f"⏭️  Skipping {no_score_count} companies: No Lead Score found.")
+
+    try:
+        # --- GENERATE (concurrently) ---
+        asyncio.run(summarize_rows(jobs, col_idx, updates))
+    finally:
+        # Flush whatever was generated, even if the loop was interrupted
+        try:
+            updates.flush()
         except Exception as e:
-            print(f"❌ Failed to update {company_name}: {e}")
+            print(f"❌ Failed to update sheet: {e}")
 
-    print(f"✅ Success! Updated {updates_made} companies with Strategic Summaries.")
+    print(f"✅ Success! Updated {updates.written} companies with Strategic Summaries.")
 
 def run_ai_strategic_layer():
     """
@@ -1,19 +1,28 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
-from serpapi import GoogleSearch
 from datetime import datetime, timedelta
 import logging
-import requests
+import asyncio
+import functools
+import httpx
 import time
+import queue
+import threading
 import os
+import io
 from company_intel import enrich_companies_from_list
 from deep_company_research import run_deep_research_for_companies
-from company_cleaner import clean_all_unstructured_reports
+from company_cleaner import clean_all_unstructured_reports, read_json, write_json
 from upload_to_sheets import upload_structured_folder_to_sheets
 from lead_scoring import run_ai_strategic_layer
 import json
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from shared_utils import orjson
 
 
 
@@ -22,13 +31,32 @@ COMPANY_INTEL_FILE = os.path.join(
     "Final_Company_Data_by_simple_approach.json"
 )
 
-@st.cache_data
+# Read-only and shared by every session; keyed on the file's mtime so
+# companies added by a later enrichment run are picked up
+@st.cache_resource(max_entries=2)
+def read_company_intel(modified_at):
+    if orjson is not None:
+        with open(COMPANY_INTEL_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    with open(COMPANY_INTEL_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 def load_company_intel():
     if os.path.exists(COMPANY_INTEL_FILE):
-        with open(COMPANY_INTEL_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return read_company_intel(os.path.getmtime(COMPANY_INTEL_FILE))
     return {}
 
+# Revenue / headcount strings are parsed once per intel file version, not on
+# every rerun (not mutated by callers, merge() returns a new frame)
+@st.cache_resource(max_entries=2)
+def read_intel_frame(modified_at):
+    return build_intel_frame(read_company_intel(modified_at))
+
+def load_intel_frame():
+    if os.path.exists(COMPANY_INTEL_FILE):
+        return read_intel_frame(os.path.getmtime(COMPANY_INTEL_FILE))
+    return build_intel_frame({})
+
 
 
 if 'show_leads' not in st.session_state:
@@ -85,6 +113,9 @@ COUNTRY_GL_HL_MAP = {
     "Bahrain": ("bh", "ar"),
 }
 
+# Lowercased once, in map order (first match wins, as before)
+COUNTRY_KEYS_LOWER = tuple((c.lower(), c) for c in COUNTRY_GL_HL_MAP)
+
 st.set_page_config(page_title="Intelligence Lead Dashboard", layout="wide")
 
 # ================= CUSTOM CSS =================
@@ -146,14 +177,15 @@ def get_high_score_companies(company_df, threshold=10):
         .tolist()
     )
 
+# Short user strings, repeated on every Streamlit rerun
+@functools.lru_cache(maxsize=256)
 def detect_search_country(user_input):
     if not user_input:
         return "United States"
     text = user_input.lower()
-    for c in COUNTRY_GL_HL_MAP:
-        if c.lower() in text:
-            return c
-    return "United States"
+    return next((c for lowered, c in COUNTRY_KEYS_LOWER if lowered in text), "United States")
+
+COUNTRY_ALIASES = {"USA": "United States", "UK": "United Kingdom", "UAE": "UAE", "KSA": "Saudi Arabia"}
 
 def extract_country(location_str):
     if not location_str:
@@ -161,19 +193,31 @@ def extract_country(location_str):
     loc = location_str.lower()
     if "remote" in loc or "anywhere" in loc:
         return "Remote"
-    parts = [p.strip() for p in location_str.split(",")]
-    last = parts[-1].upper()
-    if last in ["USA", "UK", "UAE", "KSA"]:
-        return {"USA": "United States", "UK": "United Kingdom", "UAE": "UAE", "KSA": "Saudi Arabia"}.get(last, last.title())
-    return last.title() if len(parts) > 1 else "Unknown"
+    # Only the last comma-separated part is needed
+    _, comma, last = location_str.rpartition(",")
+    last = last.strip().upper()
+    if last in COUNTRY_ALIASES:
+        return COUNTRY_ALIASES[last]
+    return last.title() if comma else "Unknown"
+
+# ================= JOB RESULTS (one list per column) =================
+JOB_COLUMNS = (
+    "Job Title", "Company", "Location", "Country", "Type",
+    "Market Source", "Posted", "Apply Link", "Job Description", "Company URL"
+)
+
+def new_job_columns():
+    """Column-wise job accumulator; pd.DataFrame(columns) needs no row transpose."""
+    return {column: [] for column in JOB_COLUMNS}
 
 # ================= SERPAPI (Google Jobs) - WITH FILTERS =================
-def get_leads_serpapi(q, loc, date_f, type_f, limit):
+SERPAPI_URL = "https://serpapi.com/search.json"
+
+async def get_leads_serpapi(q, loc, date_f, type_f, limit):
     detected_country = detect_search_country(loc)
     gl, hl = COUNTRY_GL_HL_MAP.get(detected_country, ("us", "en"))
 
-    all_jobs, seen = [], set()
-    api_index, token = 0, None
+    all_jobs, seen = new_job_columns(), set()
 
     # Handle Chips (Filters)
     chips = []
@@ -183,73 +227,110 @@ def get_leads_serpapi(q, loc, date_f, type_f, limit):
         chips.append(f"employment_type:{type_f}")
     chips_q = ",".join(chips) if chips else None
 
-    while len(all_jobs) < limit and api_index < len(SERPAPI_KEYS):
-        params = {
-            "engine": "google_jobs",
-            "q": q,
-            "location": loc,
-            "gl": gl,
-            "hl": hl,
-            "chips": chips_q,
-            "api_key": SERPAPI_KEYS[api_index],
-            "no_cache": False  # 🔥 Parameter added here to force fresh results
-        }
-        
-        if token:
-            params["next_page_token"] = token
-            # Note: docs suggest no_cache and next_page_token can be used, 
-            # but usually, the first request is where no_cache matters most.
-
+    async with httpx.AsyncClient(timeout=30.0) as client:
+
+        def request_page(api_index, token):
+            """Starts the request for one page; None once every key is used up."""
+            if api_index >= len(SERPAPI_KEYS):
+                return None
+            params = {
+                "engine": "google_jobs",
+                "q": q,
+                "location": loc,
+                "gl": gl,
+                "hl": hl,
+                "api_key": SERPAPI_KEYS[api_index],
+                "no_cache": "false"  # 🔥 Parameter added here to force fresh results
+            }
+            if chips_q:
+                params["chips"] = chips_q
+            if token:
+                params["next_page_token"] = token
+                # Note: docs suggest no_cache and next_page_token can be used, 
+                # but usually, the first request is where no_cache matters most.
+            return api_index, asyncio.create_task(client.get(SERPAPI_URL, params=params))
+
+        pending = request_page(0, None)
         try:
-            search = GoogleSearch(params)
-            res = search.get_dict()
-            jobs = res.get("jobs_results", [])
-
-            if not jobs:
-                api_index += 1
-                token = None
-                continue
-
-            for j in jobs:
-                key = f"{j.get('title')}-{j.get('company_name')}-{j.get('location')}"
-                if key in seen:
+            while pending and len(all_jobs["Job Title"]) < limit:
+                api_index, task = pending
+                pending = None
+                try:
+                    response = await task
+                    response.raise_for_status()
+                    res = response.json()
+                except Exception as e:
+                    logger.error(f"SerpAPI error: {e}")
+                    pending = request_page(api_index + 1, None)
                     continue
-                seen.add(key)
-
-                all_jobs.append({
-                    "Job Title": j.get("title"),
-                    "Company": j.get("company_name"),
-                    "Location": j.get("location"),
-                    "Country": extract_country(j.get("location")),
-                    "Type": j.get("job_type", "Not Specified"),
-                    "Market Source": "Google Jobs (SerpAPI)",
-                    "Posted": j.get("detected_extensions", {}).get("posted_at", "Recent"),
-                    "Apply Link": j.get("apply_options", [{}])[0].get("link"),
-                    "Job Description": j.get("description", "Not available (basic view)"),
-                    "Company URL": j.get("via", "Not available")
-                })
-
-                if len(all_jobs) >= limit:
-                    break
 
-            # Handle Pagination
-            token = res.get("serpapi_pagination", {}).get("next_page_token")
-            if not token:
-                api_index += 1
-        except Exception as e:
-            logger.error(f"SerpAPI error: {e}")
-            api_index += 1
+                jobs = res.get("jobs_results", [])
+
+                # Handle Pagination: the next key takes over when this one has no more pages
+                token = res.get("serpapi_pagination", {}).get("next_page_token") if jobs else None
+                next_page = (api_index, token) if token else (api_index + 1, None)
+
+                # Ask for the next page now, so it downloads while this one is processed.
+                # Skipped when this page may already reach the limit (no wasted quota).
+                if len(all_jobs["Job Title"]) + len(jobs) < limit:
+                    pending = request_page(*next_page)
+
+                for j in jobs:
+                    key = (j.get("title"), j.get("company_name"), j.get("location"))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+
+                    all_jobs["Job Title"].append(j.get("title"))
+                    all_jobs["Company"].append(j.get("company_name"))
+                    all_jobs["Location"].append(j.get("location"))
+                    all_jobs["Country"].append(extract_country(j.get("location")))
+                    all_jobs["Type"].append(j.get("job_type", "Not Specified"))
+                    all_jobs["Market Source"].append("Google Jobs (SerpAPI)")
+                    all_jobs["Posted"].append(j.get("detected_extensions", {}).get("posted_at", "Recent"))
+                    all_jobs["Apply Link"].append(j.get("apply_options", [{}])[0].get("link"))
+                    all_jobs["Job Description"].append(j.get("description", "Not available (basic view)"))
+                    all_jobs["Company URL"].append(j.get("via", "Not available"))
+
+                    if len(all_jobs["Job Title"]) >= limit:
+                        break
+
+                if pending is None and len(all_jobs["Job Title"]) < limit:
+                    pending = request_page(*next_page)
+        finally:
+            if pending:
+                pending[1].cancel()
 
     return all_jobs
-# ================= LINKEDIN (RapidAPI) - WITH JOB TYPE FILTER =================
-import requests
+# ================= RAPIDAPI HTTP CLIENT =================
+# Pooled keep-alive connections (no new TCP+TLS handshake per request) and
+# retries with backoff for throttling / gateway errors.
+RAPIDAPI_RETRY_STATUSES = (429, 502, 503, 504)
+RAPIDAPI_MAX_RETRIES = 3
+RAPIDAPI_BACKOFF = 0.3
+
+def rapidapi_client(host):
+    """One client per search with the RapidAPI headers set once."""
+    transport = httpx.AsyncHTTPTransport(
+        retries=RAPIDAPI_MAX_RETRIES,  # connection errors
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=50)
+    )
+    return httpx.AsyncClient(
+        headers={"x-rapidapi-key": RAPIDAPI_KEY or "", "x-rapidapi-host": host},
+        transport=transport,
+        timeout=30.0
+    )
 
-def get_leads_linkedin(q, loc, date_f, type_f, limit):
+async def rapidapi_get(client, url, params):
+    for attempt in range(RAPIDAPI_MAX_RETRIES + 1):
+        response = await client.get(url, params=params)
+        if response.status_code not in RAPIDAPI_RETRY_STATUSES or attempt == RAPIDAPI_MAX_RETRIES:
+            return response
+        await asyncio.sleep(RAPIDAPI_BACKOFF * 2 ** attempt)
+
+# ================= LINKEDIN (RapidAPI) - WITH JOB TYPE FILTER =================
+async def get_leads_linkedin(q, loc, date_f, type_f, limit):
     url = "https://jobs-api14.p.rapidapi.com/v2/linkedin/search"
-    headers = {
-        "x-rapidapi-key": RAPIDAPI_KEY,
-        "x-rapidapi-host": "jobs-api14.p.rapidapi.com"
-    }
 
     # Map date_f to LinkedIn datePosted values (approximate; API supports day/week/month)
     date_map = {
@@ -283,62 +364,88 @@ def get_leads_linkedin(q, loc, date_f, type_f, limit):
     if date_posted:
         params["datePosted"] = date_posted
 
-    all_jobs, seen = [], set()
+    all_jobs, seen = new_job_columns(), set()
     next_token = None
 
-    while len(all_jobs) < limit:
-        if next_token:
-            params["token"] = next_token
+    async with rapidapi_client("jobs-api14.p.rapidapi.com") as client:
+        while len(all_jobs["Job Title"]) < limit:
+            if next_token:
+                params["token"] = next_token
 
-        try:
-            res = requests.get(url, headers=headers, params=params)
-            res.raise_for_status()
-            data = res.json()
-            jobs = data.get("data", [])
+            try:
+                res = await rapidapi_get(client, url, params)
+                res.raise_for_status()
+                data = res.json()
+                jobs = data.get("data", [])
 
-            if not jobs:
-                break
-
-            for j in jobs:
-                key = f"{j.get('title')}-{j.get('companyName')}-{j.get('location')}"
-                if key in seen:
-                    continue
-                seen.add(key)
-
-                all_jobs.append({
-                    "Job Title": j.get("title"),
-                    "Company": j.get("companyName", "Unknown"),
-                    "Location": j.get("location"),
-                    "Country": extract_country(j.get("location")),
-                    "Type": j.get("employmentType", type_f if type_f != "All" else "Not Specified"),
-                    "Market Source": "LinkedIn (RapidAPI)",
-                    "Posted": j.get("postedTimeAgo", j.get("datePosted", "Unknown")),
-                    "Apply Link": j.get("applyUrl", f"https://www.linkedin.com/jobs/view/{j.get('id')}"),  # Fallback to LinkedIn job URL
-                    "Job Description": j.get("description", "Not available (use /job-details endpoint for full desc)"),
-                    "Company URL": j.get("companyUrl", "Not available")  # Add this line
-                })
-
-                if len(all_jobs) >= limit:
+                if not jobs:
                     break
 
-            next_token = data.get("meta", {}).get("nextToken")
-            if not next_token:
-                break
+                for j in jobs:
+                    key = (j.get("title"), j.get("companyName"), j.get("location"))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+
+                    all_jobs["Job Title"].append(j.get("title"))
+                    all_jobs["Company"].append(j.get("companyName", "Unknown"))
+                    all_jobs["Location"].append(j.get("location"))
+                    all_jobs["Country"].append(extract_country(j.get("location")))
+                    all_jobs["Type"].append(j.get("employmentType", type_f if type_f != "All" else "Not Specified"))
+                    all_jobs["Market Source"].append("LinkedIn (RapidAPI)")
+                    all_jobs["Posted"].append(j.get("postedTimeAgo", j.get("datePosted", "Unknown")))
+                    all_jobs["Apply Link"].append(j.get("applyUrl", f"https://www.linkedin.com/jobs/view/{j.get('id')}"))  # Fallback to LinkedIn job URL
+                    all_jobs["Job Description"].append(j.get("description", "Not available (use /job-details endpoint for full desc)"))
+                    all_jobs["Company URL"].append(j.get("companyUrl", "Not available"))  # Add this line
+
+                    if len(all_jobs["Job Title"]) >= limit:
+                        break
+
+                next_token = data.get("meta", {}).get("nextToken")
+                if not next_token:
+                    break
 
-            time.sleep(0.5)  # Rate limiting
+                await asyncio.sleep(0.5)  # Rate limiting
 
-        except Exception as e:
-            logger.error(f"LinkedIn API error: {e}")
-            break
+            except Exception as e:
+                logger.error(f"LinkedIn API error: {e}")
+                break
 
-    return all_jobs[:limit]
+    return all_jobs
 
 # ================= JSEARCH - WITH JOB TYPE & DATE FILTER (via query) =================
-def get_leads_jsearch(q, loc, date_f, type_f, limit):
-    headers = {
-        "x-rapidapi-key": RAPIDAPI_KEY,
-        "x-rapidapi-host": "jsearch.p.rapidapi.com"
-    }
+JSEARCH_DETAIL_CONCURRENCY = 10
+JSEARCH_DETAIL_INTERVAL = 0.1  # Minimum gap between job-details request starts
+
+class RequestPacer:
+    """Spaces request starts at least `interval` seconds apart."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            if self.next_start > now:
+                await asyncio.sleep(self.next_start - now)
+            self.next_start = max(now, self.next_start) + self.interval
+
+async def fetch_job_description(client, details_url, job_id, semaphore, pacer):
+    async with semaphore:
+        await pacer.wait()
+        try:
+            details_resp = await rapidapi_get(client, details_url, {"job_id": job_id})
+            details_data = details_resp.json()
+            if details_data.get("status") == "OK" and details_data.get("data"):
+                detail = details_data["data"][0]
+                return detail.get("job_description", "Not available")
+            return "Not fetched"
+        except Exception:
+            return "Error fetching details"
+
+async def get_leads_jsearch(q, loc, date_f, type_f, limit):
     search_url = "https://jsearch.p.rapidapi.com/search"
     details_url = "https://jsearch.p.rapidapi.com/job-details"
 
@@ -370,88 +477,81 @@ def get_leads_jsearch(q, loc, date_f, type_f, limit):
         "num_pages": str((limit // 10) + 2)
     }
 
-    try:
-        response = requests.get(search_url, headers=headers, params=search_params)
-        data = response.json()
-        if data.get("status") != "OK":
-            return []
-        jobs = data.get("data", [])[:limit * 2]  # Get extra to filter
-    except Exception as e:
-        logger.error(f"JSearch search error: {e}")
-        return []
+    async with rapidapi_client("jsearch.p.rapidapi.com") as client:
+        try:
+            response = await rapidapi_get(client, search_url, search_params)
+            data = response.json()
+            if data.get("status") != "OK":
+                return new_job_columns()
+            jobs = data.get("data", [])[:limit * 2]  # Get extra to filter
+        except Exception as e:
+            logger.error(f"JSearch search error: {e}")
+            return new_job_columns()
 
-    results = []
-    seen = set()
+        results, job_ids = new_job_columns(), []
+        seen = set()
 
-    for job in jobs:
-        job_id = job.get("job_id")
-        key = f"{job.get('job_title')}-{job.get('employer_name')}-{job.get('job_location')}"
-        if key in seen:
-            continue
-        seen.add(key)
+        for job in jobs:
+            job_id = job.get("job_id")
+            key = (job.get("job_title"), job.get("employer_name"), job.get("job_location"))
+            if key in seen:
+                continue
+            seen.add(key)
+
+            city = job.get("job_city") or ""
+            state = job.get("job_state") or ""
+            country = job.get("job_country") or ""
+            location_parts = [p for p in [city, state, country] if p]
+            location = ", ".join(location_parts) if location_parts else "Remote/Unknown"
+
+            job_ids.append(job_id)
+            results["Job Title"].append(job.get("job_title"))
+            results["Company"].append(job.get("employer_name"))
+            results["Location"].append(job.get("job_location", location))
+            results["Country"].append(extract_country(job.get("job_location", "")))
+            results["Type"].append(job.get("job_employment_type", "Not Specified"))
+            results["Market Source"].append("JSearch (Enhanced Google Jobs)")
+            results["Posted"].append(job.get("job_posted_at", "Recent"))
+            results["Apply Link"].append(job.get("job_apply_link"))
+            results["Company URL"].append(job.get("employer_website", "Not available"))
+
+            if len(results["Job Title"]) >= limit:
+                break
 
-        city = job.get("job_city") or ""
-        state = job.get("job_state") or ""
-        country = job.get("job_country") or ""
-        location_parts = [p for p in [city, state, country] if p]
-        location = ", ".join(location_parts) if location_parts else "Remote/Unknown"
-
-        description = "Not fetched"
-        try:
-            details_resp = requests.get(details_url, headers=headers, params={"job_id": job_id})
-            details_data = details_resp.json()
-            if details_data.get("status") == "OK" and details_data.get("data"):
-                detail = details_data["data"][0]
-                description = detail.get("job_description", "Not available")
-                time.sleep(0.2)
-        except:
-            description = "Error fetching details"
-
-        results.append({
-            "Job Title": job.get("job_title"),
-            "Company": job.get("employer_name"),
-            "Location": job.get("job_location", location),
-            "Country": extract_country(job.get("job_location", "")),
-            "Type": job.get("job_employment_type", "Not Specified"),
-            "Market Source": "JSearch (Enhanced Google Jobs)",
-            "Posted": job.get("job_posted_at", "Recent"),
-            "Apply Link": job.get("job_apply_link"),
-            "Job Description": description,
-            "Company URL": job.get("employer_website", "Not available")
-        })
-
-        if len(results) >= limit:
-            break
+        # Details for the kept jobs, fetched concurrently (bounded and paced)
+        semaphore = asyncio.Semaphore(JSEARCH_DETAIL_CONCURRENCY)
+        pacer = RequestPacer(JSEARCH_DETAIL_INTERVAL)
+        results["Job Description"] = list(await asyncio.gather(*(
+            fetch_job_description(client, details_url, job_id, semaphore, pacer)
+            for job_id in job_ids
+        )))
 
     return results
 import re
-def normalize_revenue(rev):
-    if not rev or not isinstance(rev, str):
-        return None
 
-    r = rev.lower().replace(",", "").strip()
-
-    try:
-        # INR Crores
-        if "₹" in r and "cr" in r:
-            return float(r.split("₹")[1].split("cr")[0].strip()) * 0.12
-
-        # $14.37B or $14.37b
-        if re.search(r"\$\d+(\.\d+)?b", r):
-            return float(r.replace("$", "").replace("b", "")) * 1000
+# One pass classifies and extracts: ₹ crores, $14.37B, 670.4 million, 55.3 billion
+REVENUE_RE = re.compile(
+    r"₹\s*(?P<cr>\d+(?:\.\d+)?)\s*cr"
+    r"|\$(?P<b>\d+(?:\.\d+)?)b"
+    r"|(?P<mil>\d+(?:\.\d+)?)\s*million"
+    r"|(?P<bil>\d+(?:\.\d+)?)\s*billion"
+)
+# Revenue in $M per matched unit
+REVENUE_UNIT_TO_MILLIONS = {"cr": 0.12, "b": 1000, "mil": 1, "bil": 1000}
 
-        # $670.4 million
-        if "million" in r:
-            return float(r.split()[0])
+# "5000", "201-500", "5000+"
+EMPLOYEE_COUNT_RE = re.compile(r"^(\d+)(?:\s*-\s*(\d+)|\s*(\+))?$")
 
-        # $55.3 billion
-        if "billion" in r:
-            return float(r.split()[0]) * 1000
+def normalize_revenue(rev):
+    if not rev or not isinstance(rev, str):
+        return None
 
-    except:
+    match = REVENUE_RE.search(rev.lower().replace(",", ""))
+    if not match:
         return None
 
-    return None
+    unit = match.lastgroup
+    return float(match.group(unit)) * REVENUE_UNIT_TO_MILLIONS[unit]
 
 
 def normalize_employee_count(val):
@@ -467,40 +567,40 @@ def normalize_employee_count(val):
     if not isinstance(val, str):
         return None
 
-    v = val.lower().replace(",", "").strip()
+    match = EMPLOYEE_COUNT_RE.match(val.lower().replace(",", "").strip())
+    if not match:
+        return None
 
-    # "5000+"
-    if v.endswith("+"):
-        return int(v[:-1])
+    low, high, _plus = match.groups()
 
     # "201-500"
-    if "-" in v:
-        try:
-            low, high = v.split("-")
-            return (int(low) + int(high)) // 2
-        except:
-            return None
+    if high is not None:
+        return (int(low) + int(high)) // 2
 
-    # "1000"
-    try:
-        return int(v)
-    except:
-        return None
+    # "5000+" / "1000"
+    return int(low)
 
 
 
 
+REVENUE_RANGES = {
+    "1M/yr - 50M/yr": (1, 50),
+    "50M/yr - 1B/yr": (50, 1000),
+    "1B+/yr": (1000, float("inf"))
+}
+
+EMPLOYEE_RANGES = {
+    "10 - 100": (10, 100),
+    "100 - 999": (100, 999),
+    "1000 - 5000": (1000, 5000),
+    "5000+": (5000, float("inf"))
+}
+
 def revenue_match_score(val, user_choice):
     if val is None or user_choice == "Any":
         return 0
 
-    ranges = {
-        "1M/yr - 50M/yr": (1, 50),
-        "50M/yr - 1B/yr": (50, 1000),
-        "1B+/yr": (1000, float("inf"))
-    }
-
-    low, high = ranges[user_choice]
+    low, high = REVENUE_RANGES[user_choice]
 
     if low <= val <= high:
         return 5
@@ -515,14 +615,7 @@ def employee_match_score(val, user_choice):
     if val is None or user_choice == "Any":
         return 0
 
-    ranges = {
-        "10 - 100": (10, 100),
-        "100 - 999": (100, 999),
-        "1000 - 5000": (1000, 5000),
-        "5000+": (5000, float("inf"))
-    }
-
-    low, high = ranges[user_choice]
+    low, high = EMPLOYEE_RANGES[user_choice]
 
     if low <= val <= high:
         return 5
@@ -531,6 +624,14 @@ def employee_match_score(val, user_choice):
     return 0
 
 
+INTENT_BONUS = {
+    "CRM Migration": 25,
+    "System Integration": 20,
+    "Salesforce Optimization": 15,
+    "Ongoing Salesforce Support": 10,
+    "Salesforce Expansion": 10
+}
+
 def final_lead_score(row, intel, revenue_q, size_q):
     score = 0
 
@@ -538,14 +639,7 @@ def final_lead_score(row, intel, revenue_q, size_q):
     score += row["Open_Roles"] * 5
 
     # 2️⃣ Intent score (keep existing)
-    intent_bonus = {
-        "CRM Migration": 25,
-        "System Integration": 20,
-        "Salesforce Optimization": 15,
-        "Ongoing Salesforce Support": 10,
-        "Salesforce Expansion": 10
-    }
-    score += intent_bonus.get(row["Detected Need"], 0)
+    score += INTENT_BONUS.get(row["Detected Need"], 0)
 
     # 3️⃣ Company intelligence
     company = row["Company"]
@@ -560,71 +654,128 @@ def final_lead_score(row, intel, revenue_q, size_q):
 
 
 # ================= LEAD INTELLIGENCE HELPERS =================
-def detect_need(text):
-    t = text.lower()
-
-    if any(k in t for k in ["migration", "migrate", "transition", "move from"]):
-        return "CRM Migration"
-
-    if any(k in t for k in ["optimize", "optimization", "performance", "improve"]):
-        return "Salesforce Optimization"
+# Checked in order: the first category with any keyword in the text wins
+NEED_PATTERNS = (
+    ("CRM Migration", re.compile(r"migration|migrate|transition|move from", re.I)),
+    ("Salesforce Optimization", re.compile(r"optimize|optimization|performance|improve", re.I)),
+    ("System Integration", re.compile(r"integration|api|erp|sap|oracle", re.I)),
+    ("Ongoing Salesforce Support", re.compile(r"admin|support|managed services", re.I)),
+)
 
-    if any(k in t for k in ["integration", "api", "erp", "sap", "oracle"]):
-        return "System Integration"
+# All labels in priority order; a company gets the highest-priority need of its jobs
+NEED_LABELS = tuple(need for need, _ in NEED_PATTERNS) + ("Salesforce Expansion",)
+NEED_RANK = {need: rank for rank, need in enumerate(NEED_LABELS)}
 
-    if any(k in t for k in ["admin", "support", "managed services"]):
-        return "Ongoing Salesforce Support"
+def detect_need(text):
+    for need, pattern in NEED_PATTERNS:
+        if pattern.search(text):
+            return need
 
     return "Salesforce Expansion"
-def final_lead_score_no_intent(row, intel, revenue_q, size_q):
-    score = 0
-    breakdown = []
-
-    # 1️⃣ Vacancy scoring PER ROLE
-    roles = row.get("Job_Roles", [])
-    for role in roles:
-        score += 5
-        breakdown.append(f"+5 (Role: {role})")
+def match_scores(values, ranges, user_choice):
+    """Column version of revenue_match_score / employee_match_score (NaN -> 0)."""
+    if user_choice == "Any":
+        return np.zeros(len(values))
 
-    # 2️⃣ Revenue & Size match
-    company = row["Company"]
-    if company in intel:
-        rev_raw = intel[company].get("Annual Revenue")
-        emp = intel[company].get("Total Employee Count")
+    low, high = ranges[user_choice]
+    return np.select(
+        [values.between(low, high), values.between(low * 0.8, high * 1.2)],
+        [5, 2.5],
+        0
+    )
 
-        rev = normalize_revenue(rev_raw)
+def join_breakdown(text, part):
+    """Appends a breakdown part with " | " where both sides are non-empty."""
+    separator = np.where((text != "") & (part != ""), " | ", "")
+    return text + separator + part
 
-        rev_score = revenue_match_score(rev, revenue_q)
-        emp_score = employee_match_score(emp, size_q)
+def build_intel_frame(intel):
+    """
+    Intel dict -> one row per company with the parsed revenue / employee numbers.
+    The raw cells are kept as the original Python objects (object dtype): a
+    null headcount elsewhere must not turn 50 into 50.0, which
+    normalize_employee_count rejects and the breakdown would print.
+    """
+    companies = list(intel)
+    revenues = [intel[company].get("Annual Revenue") for company in companies]
+    employees = [intel[company].get("Total Employee Count") for company in companies]
+
+    return pd.DataFrame({
+        "Company": companies,
+        "Annual Revenue": pd.Series(revenues, dtype=object),
+        "Total Employee Count": pd.Series(employees, dtype=object),
+        "rev_num": pd.to_numeric(pd.Series([normalize_revenue(r) for r in revenues], dtype=object)),
+        "emp_num": pd.to_numeric(pd.Series([normalize_employee_count(e) for e in employees], dtype=object)),
+    })
+
+def final_lead_scores_no_intent(company_df, intel_df, revenue_q, size_q):
+    """
+    Lead score and breakdown for every company at once: the parsed intel frame
+    (load_intel_frame) is joined in with one merge, then the match scores are
+    computed per column.
+    """
+    # 1️⃣ Vacancy scoring PER ROLE
+    role_score = company_df["Job_Roles"].str.len().to_numpy()
+    breakdown = company_df["Job_Roles"].map(
+        lambda roles: " | ".join(f"+5 (Role: {role})" for role in roles)
+    ).to_numpy(dtype=object)
+
+    # 2️⃣ Revenue & Size match (intel already parsed into a frame, one left merge)
+    matched = company_df[["Company"]].merge(intel_df, on="Company", how="left")
+
+    rev_score = match_scores(matched["rev_num"], REVENUE_RANGES, revenue_q)
+    emp_score = match_scores(matched["emp_num"], EMPLOYEE_RANGES, size_q)
+
+    score_text = {5: "+5", 2.5: "+2.5"}
+    rev_part = np.where(
+        rev_score > 0,
+        pd.Series(rev_score).map(score_text) + " (Revenue: " + matched["Annual Revenue"].astype(str) + ")",
+        ""
+    )
+    emp_part = np.where(
+        emp_score > 0,
+        pd.Series(emp_score).map(score_text) + " (Employees: " + matched["Total Employee Count"].astype(str) + ")",
+        ""
+    )
+    breakdown = join_breakdown(join_breakdown(breakdown, rev_part), emp_part)
 
-        if rev_score > 0:
-            breakdown.append(f"+{rev_score} (Revenue: {rev_raw})")
+    scores = np.minimum(role_score * 5 + rev_score + emp_score, 100).astype(float)
+    return scores, breakdown
 
-        if emp_score > 0:
-            breakdown.append(f"+{emp_score} (Employees: {emp})")
 
-        score += rev_score + emp_score
 
-    return min(score, 100), " | ".join(breakdown)
 
+def calculate_lead_scores(company_df):
+    """Vacancy score (capped at 60) + intent bonus, capped at 100, for every company at once."""
+    vacancy_score = (company_df["Open_Roles"] * 20).clip(upper=60)
+    intent_score = company_df["Detected Need"].map(INTENT_BONUS).fillna(0)
+    return (vacancy_score + intent_score).clip(upper=100).astype(int)
 
+STRUCTURED_UPDATE_WORKERS = 8
 
+def inject_lead_score(file, score_map):
+    """
+    Writes the company's lead_scoring block into one structured JSON.
+    Returns True when the file was rewritten (unchanged files are left alone).
+    """
+    data = read_json(file)
 
-def calculate_lead_score(row):
-    score = 0
+    meta_name = (
+        data.get("meta", {})
+        .get("company_name", "")
+        .strip()
+        .lower()
+    )
 
-    score += min(row["Open_Roles"] * 20, 60)
+    if not meta_name or meta_name not in score_map:
+        return False
 
-    intent_bonus = {
-        "CRM Migration": 25,
-        "System Integration": 20,
-        "Salesforce Optimization": 15,
-        "Ongoing Salesforce Support": 10,
-        "Salesforce Expansion": 10
-    }
+    if data.get("lead_scoring") == score_map[meta_name]:
+        return False
 
-    score += intent_bonus.get(row["Detected Need"], 0)
-    return min(score, 100)
+    data["lead_scoring"] = score_map[meta_name]
+    write_json(data, file)
+    return True
 
 def update_structured_json_with_scores(company_df, structured_dir="structured_data"):
     structured_dir = Path(structured_dir)
@@ -636,69 +787,87 @@ def update_structured_json_with_scores(company_df, structured_dir="structured_da
         return
 
     score_map = {
-        row["Company"].strip().lower(): {
-            "lead_score": float(row["Lead Score"]),
-            "rank_breakout": row["Rank (Breakout)"]
+        company.strip().lower(): {
+            "lead_score": float(score),
+            "rank_breakout": breakout
         }
-        for _, row in company_df.iterrows()
+        for company, score, breakout in zip(
+            company_df["Company"], company_df["Lead Score"], company_df["Rank (Breakout)"]
+        )
     }
 
+    files = list(structured_dir.glob("*_Structured.json"))
     updated = 0
 
-    for file in structured_dir.glob("*_Structured.json"):
-        try:
-            with file.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            meta_name = (
-                data.get("meta", {})
-                .get("company_name", "")
-                .strip()
-                .lower()
-            )
+    # Small independent files: overlap their disk I/O
+    with ThreadPoolExecutor(max_workers=STRUCTURED_UPDATE_WORKERS) as executor:
+        futures = {executor.submit(inject_lead_score, file, score_map): file for file in files}
+        for future in as_completed(futures):
+            try:
+                updated += future.result()
+            except Exception as e:
+                print(f"❌ Failed updating {futures[future].name}: {e}")
 
-            if not meta_name or meta_name not in score_map:
-                continue
+    print(f"✅ Lead scoring injected into {updated} structured JSON files")
 
-            data["lead_scoring"] = score_map[meta_name]
 
-            with file.open("w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
 
-            updated += 1
 
-        except Exception as e:
-            print(f"❌ Failed updating {file.name}: {e}")
 
-    print(f"✅ Lead scoring injected into {updated} structured JSON files")
+# Same provider + filters within 10 minutes -> no new API calls on reruns / repeated clicks
+@st.cache_data(ttl=600, max_entries=64, show_spinner=False)
+def search_jobs(provider, q, loc, date_f, type_f, limit):
+    if provider.startswith("SerpAPI"):
+        return asyncio.run(get_leads_serpapi(q, loc, date_f, type_f, limit))
+    elif provider.startswith("LinkedIn"):
+        return asyncio.run(get_leads_linkedin(q, loc, date_f, type_f, limit))
+    else:
+        return asyncio.run(get_leads_jsearch(q, loc, date_f, type_f, limit))
 
 
+def is_company_column(name):
+    return str(name).strip().lower() == "company"
 
+def read_company_column(uploaded_file):
+    """
+    Values of the file's 'Company' column (any case / padding), or None when
+    it has none. Only that column is parsed.
+    """
+    if uploaded_file.name.endswith(".csv"):
+        # Header first, to find the exact column name for include_columns
+        header = pacsv.open_csv(uploaded_file).schema.names
+        company_cols = [c for c in header if is_company_column(c)]
+        if not company_cols:
+            return None
+        uploaded_file.seek(0)
+        table = pacsv.read_csv(
+            uploaded_file,
+            convert_options=pacsv.ConvertOptions(
+                include_columns=company_cols[:1],
+                column_types={company_cols[0]: pa.string()},
+                strings_can_be_null=True  # blank / "NA" cells are dropped, as with read_csv
+            )
+        )
+        return table.column(0).to_pylist()
 
+    df = pd.read_excel(uploaded_file, usecols=is_company_column)
+    if df.columns.empty:
+        return None
+    return df.iloc[:, 0].dropna().astype(str).tolist()
 
 def load_uploaded_companies(uploaded_file):
     if uploaded_file is None:
         return []
 
     try:
-        if uploaded_file.name.endswith(".csv"):
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
-
-        df.columns = [c.strip().lower() for c in df.columns]
+        values = read_company_column(uploaded_file)
 
-        if "company" not in df.columns:
+        if values is None:
             st.error("❌ Uploaded file must contain a 'Company' column")
             return []
 
-        companies = (
-            df["company"]
-            .dropna()
-            .astype(str)
-            .unique()
-            .tolist()
-        )
+        # Unique, in file order
+        companies = list(dict.fromkeys(v for v in values if v is not None))
 
         return companies
 
@@ -707,6 +876,75 @@ def load_uploaded_companies(uploaded_file):
         return []
 
 
+# ================= BACKGROUND PIPELINE =================
+def _run_stages(stages, events, stop):
+    """Worker thread: runs each stage in order and reports to the UI thread.
+    stop is checked between stages; a running stage is never interrupted."""
+    try:
+        for index, (_, _, stage) in enumerate(stages):
+            if stop.is_set():
+                events.put(("stopped", index))
+                return
+            events.put(("start", index))
+            stage()
+        events.put(("done", None))
+    except Exception as e:
+        events.put(("error", e))
+
+def pipeline_running():
+    """True while this session's background pipeline thread is still alive."""
+    pipeline = st.session_state.get("pipeline")
+    return pipeline is not None and pipeline["thread"].is_alive()
+
+def stop_pipeline():
+    """Button callback: ask the running pipeline to stop after its current stage."""
+    pipeline = st.session_state.get("pipeline")
+    if pipeline is not None:
+        pipeline["stop"].set()
+
+def run_pipeline_with_progress(stages, progress_text, progress_bar):
+    """
+    Runs [(label, percent when finished, fn), ...] on a background thread.
+    The script thread only polls for stage changes, so the progress bar and
+    elapsed time reflect the stage that is actually running.
+
+    The thread is kept in st.session_state: a rerun stops the polling but not
+    the thread, so a second run is refused until the first one has finished.
+    Returns True when every stage completed, False when refused or stopped.
+    """
+    if pipeline_running():
+        st.warning("⏳ A pipeline run is still in progress. Wait for it to finish or stop it first.")
+        return False
+
+    events, stop = queue.Queue(), threading.Event()
+    thread = threading.Thread(target=_run_stages, args=(stages, events, stop), daemon=True)
+    st.session_state.pipeline = {"thread": thread, "stop": stop}
+    thread.start()
+    st.button("⏹ Stop after the current stage", on_click=stop_pipeline)
+
+    label, started = "", time.monotonic()
+    while True:
+        try:
+            kind, value = events.get(timeout=0.25)
+        except queue.Empty:
+            progress_text.text(f"{label} ({time.monotonic() - started:.0f}s)")
+            continue
+
+        if kind == "start":
+            if value > 0:
+                progress_bar.progress(stages[value - 1][1])
+            label, started = stages[value][0], time.monotonic()
+            progress_text.text(label)
+        elif kind == "done":
+            progress_bar.progress(stages[-1][1])
+            return True
+        elif kind == "stopped":
+            progress_text.text(f"⏹ Stopped before: {stages[value][0]}")
+            return False
+        else:
+            raise value
+
+
 # ================= SIDEBAR =================
 with st.sidebar:
     st.title("⚙️ Search Logic")
@@ -738,32 +976,38 @@ if uploaded_file:
         "and automatically uploaded to Google Sheets."
     )
 
-    if st.button("🚀 Generate Company Intelligence from Uploaded File"):
+    if pipeline_running():
+        # A rerun stopped the progress view, the run itself carries on
+        st.info("⏳ Company intelligence is still being generated in the background.")
+        st.button("⏹ Stop after the current stage", on_click=stop_pipeline)
+    elif st.button("🚀 Generate Company Intelligence from Uploaded File"):
         companies = load_uploaded_companies(uploaded_file)
 
         if companies:
             progress_text = st.empty()
             progress_bar = st.progress(0)
 
-            # STEP 1: Deep Research
-            progress_text.text("🔍 Running deep company research...")
-            run_deep_research_for_companies(companies)
-            progress_bar.progress(50)
-
-            # STEP 2: Cleaning
-            progress_text.text("🧹 Cleaning & structuring company intelligence...")
-            clean_all_unstructured_reports(
-                unstructured_dir="Unstructured_data",
-                structured_dir="structured_data"
+            completed = run_pipeline_with_progress(
+                [
+                    # STEP 1: Deep Research
+                    ("🔍 Running deep company research...", 50,
+                     lambda: run_deep_research_for_companies(companies)),
+                    # STEP 2: Cleaning
+                    ("🧹 Cleaning & structuring company intelligence...", 80,
+                     lambda: clean_all_unstructured_reports(
+                         unstructured_dir="Unstructured_data",
+                         structured_dir="structured_data"
+                     )),
+                    # STEP 3: Upload
+                    ("📤 Uploading structured data to Google Sheets...", 100,
+                     upload_structured_folder_to_sheets),
+                ],
+                progress_text,
+                progress_bar
             )
-            progress_bar.progress(80)
-
-            # STEP 3: Upload
-            progress_text.text("📤 Uploading structured data to Google Sheets...")
-            upload_structured_folder_to_sheets()
-            progress_bar.progress(100)
 
-            st.success("✅ Uploaded file processed and synced to Google Sheets!")
+            if completed:
+                st.success("✅ Uploaded file processed and synced to Google Sheets!")
 
 
 
@@ -820,43 +1064,53 @@ if st.button("Generate Final Report"):
         st.error("Please fill in both Job Role and Location.")
     else:
         with st.spinner(f"Fetching up to {target} jobs via {provider}..."):
-            if provider.startswith("SerpAPI"):
-                results = get_leads_serpapi(job_q, loc_q, date_val, type_val, target)
-            elif provider.startswith("LinkedIn"):
-                results = get_leads_linkedin(job_q, loc_q, date_val, type_val, target)
-            else:
-                results = get_leads_jsearch(job_q, loc_q, date_val, type_val, target)
-
-        if not results:
+            results = search_jobs(provider, job_q, loc_q, date_val, type_val, target)
+
+        if not results["Job Title"]:
+            # Don't keep an empty / failed search in the cache
+            search_jobs.clear(provider, job_q, loc_q, date_val, type_val, target)
             st.warning("No jobs found. Try broadening filters or switching source.")
             st.session_state.df = None
         else:
             # Create DataFrames
-            df = pd.DataFrame(results)
-            df["Company"] = df["Company"].astype(str).replace(
-                {"None": "Unknown", "nan": "Unknown", "[]": "Unknown", "{}": "Unknown"}
+            # Every job column is text: Arrow-backed strings hash and group in C
+            df = pd.DataFrame(results, dtype="string[pyarrow]")
+            df["Company"] = df["Company"].mask(
+                df["Company"].isna() | df["Company"].isin(["None", "nan", "[]", "{}"]),
+                "Unknown"
             )
             
-            # Aggregation
+            # Aggregation (built-in "unique" instead of per-group Python lambdas)
             company_df = (
                 df.groupby("Company")
                 .agg(
-                    Job_Roles=("Job Title", lambda x: list(set(x))),
-                    Open_Roles=("Job Title", "count"),
-                    Locations=("Location", lambda x: ", ".join(set(x))),
-                    Countries=("Country", lambda x: ", ".join(set(x))),
-                    Job_Types=("Type", lambda x: ", ".join(set(x))),
-                    Descriptions=("Job Description", lambda x: " ".join(x.astype(str))),
+                    Job_Roles=("Job Title", "unique"),
+                    Locations=("Location", "unique"),
+                    Countries=("Country", "unique"),
+                    Job_Types=("Type", "unique"),
                 )
                 .reset_index()
             )
-            company_df["Open_Roles"] = company_df["Job_Roles"].apply(len)
-            company_df["Detected Need"] = company_df["Descriptions"].apply(detect_need)
-            company_df["Why This Lead"] = company_df.apply(
-                lambda r: f"Hiring {r['Open_Roles']} role(s) across {r['Countries']}, indicating {r['Detected Need'].lower()}.",
-                axis=1
+            for col in ["Locations", "Countries", "Job_Types"]:
+                company_df[col] = company_df[col].str.join(", ")
+            company_df["Open_Roles"] = company_df["Job_Roles"].str.len()
+
+            # Need per job, scanning each distinct description once (templated
+            # descriptions repeat), then the highest-priority need per company
+            descriptions = df["Job Description"].astype(str)
+            need_by_description = {text: detect_need(text) for text in descriptions.unique()}
+            company_need_rank = (
+                descriptions.map(need_by_description).map(NEED_RANK)
+                .groupby(df["Company"])
+                .min()
+            )
+            company_df["Detected Need"] = company_df["Company"].map(company_need_rank).map(dict(enumerate(NEED_LABELS)))
+            company_df["Why This Lead"] = (
+                "Hiring " + company_df["Open_Roles"].astype(str)
+                + " role(s) across " + company_df["Countries"]
+                + ", indicating " + company_df["Detected Need"].str.lower() + "."
             )
-            company_df["Lead Score"] = company_df.apply(calculate_lead_score, axis=1)
+            company_df["Lead Score"] = calculate_lead_scores(company_df)
             company_df = company_df.sort_values("Lead Score", ascending=False)
 
             # 🔥 STORE IN SESSION STATE
@@ -879,19 +1133,22 @@ if st.session_state.df is not None:
     # --- VISUALS ---
     col1, col2 = st.columns(2)
     with col1:
-        top_companies = df["Company"].value_counts().head(10).reset_index()
-        top_companies.columns = ["Company", "Open Roles"]
+        top_companies = df["Company"].value_counts().head(10).rename_axis("Company").reset_index(name="Open Roles")
         st.plotly_chart(px.bar(top_companies, x="Company", y="Open Roles", title="🏢 Top Hiring Companies"), use_container_width=True)
     
     with col2:
-        top_locations = df["Location"].value_counts().head(10).reset_index()
-        top_locations.columns = ["Location", "Job Count"]
+        top_locations = df["Location"].value_counts().head(10).rename_axis("Location").reset_index(name="Job Count")
         st.plotly_chart(px.bar(top_locations, x="Location", y="Job Count", title="📍 Top Locations"), use_container_width=True)
 
     # --- MAP ---
     st.markdown("### 🗺️ Global Job Distribution Map")
-    country_counts = df.groupby("Country").size().reset_index(name="Job Count")
-    country_counts = country_counts[~country_counts["Country"].isin(["Unknown", "Remote"])]
+    # Filter first, then count (no groupby over rows that are dropped anyway)
+    country_counts = (
+        df.loc[~df["Country"].isin(["Unknown", "Remote"]), "Country"]
+        .value_counts()
+        .rename_axis("Country")
+        .reset_index(name="Job Count")
+    )
     st.plotly_chart(px.scatter_geo(country_counts, locations="Country", locationmode="country names", size="Job Count", projection="natural earth"), use_container_width=True)
 
     # --- DETAILED TABLE ---
@@ -920,27 +1177,24 @@ if st.session_state.df is not None:
             enrich_companies_from_list(companies)
 
         with st.spinner("📊 Recalculating lead scores..."):
-            intel = load_company_intel()
-
-            scores = company_df.apply(
-                lambda r: final_lead_score_no_intent(
-                    r, intel, revenue_q, company_size_q
-                ),
-                axis=1,
-                result_type="expand"   # 👈 IMPORTANT
+            intel_df = load_intel_frame()
+
+            scores, breakdown = final_lead_scores_no_intent(
+                company_df, intel_df, revenue_q, company_size_q
             )
 
-            company_df["Lead Score"] = scores[0].astype(float)
-            company_df["Rank (Breakout)"] = scores[1]
+            company_df["Lead Score"] = scores
+            company_df["Rank (Breakout)"] = breakdown
 
             company_df = company_df.sort_values("Lead Score", ascending=False)
             update_structured_json_with_scores(company_df)
         st.success("✅ Intelligence enrichment & ranking complete")
 
+        # Only the shown columns are handed to Streamlit for Arrow serialization
         st.dataframe(
             company_df[
                 ["Company", "Countries", "Open_Roles", "Detected Need", "Why This Lead", "Lead Score", "Rank (Breakout)"]
-            ],
+            ].reset_index(drop=True),
             use_container_width=True
         )
 
@@ -1002,8 +1256,11 @@ if st.session_state.df is not None:
 
 
     # --- DOWNLOAD ---
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button(label="📥 Download Full Report (CSV)", data=csv, file_name=f"Report.csv", mime="text/csv")
+    # Arrow writes the UTF-8 CSV straight from the string[pyarrow] columns
+    # (no intermediate Python str to encode)
+    csv_buffer = io.BytesIO()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), csv_buffer)
+    st.download_button(label="📥 Download Full Report (CSV)", data=csv_buffer.getvalue(), file_name=f"Report.csv", mime="text/csv")
 
 
 
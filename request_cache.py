@@ -0,0 +1,130 @@
+# ============================================================
+# ON-DISK CACHE FOR EXPENSIVE API CALLS (Groq / Tavily)
+# ============================================================
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from shared_utils import orjson
+
+CACHE_DIR = Path("cache")
+DEFAULT_MAX_AGE = 7 * 24 * 3600  # 7 days, search results go stale after that
+DEFAULT_MEMORY_ENTRIES = 1024  # per namespace, least recently used dropped first
+
+
+def make_cache_key(*parts):
+    """
+    Stable sha256 key over every input that changes the API response
+    (company, model, prompt, raw data, query options...).
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class JsonCache:
+    """
+    One JSON file per key under cache/<namespace>/, with a max age.
+    Recent values are also kept in a bounded in-memory LRU, under the same max age.
+    """
+
+    def __init__(self, namespace, max_age=DEFAULT_MAX_AGE, keep_in_memory=True, cache_dir=CACHE_DIR,
+                 max_memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.dir = Path(cache_dir) / namespace
+        self.max_age = max_age
+        self.keep_in_memory = keep_in_memory
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()  # key -> (saved_at, value)
+
+    def _path(self, key):
+        return self.dir / f"{key}.json"
+
+    def get(self, key):
+        """Cached value, or None when missing, unreadable or expired."""
+        cached = self._memory.get(key)
+        if cached is not None:
+            saved_at, value = cached
+            if time.time() - saved_at <= self.max_age:
+                self._memory.move_to_end(key)
+                return value
+            del self._memory[key]
+
+        try:
+            if orjson is not None:
+                entry = orjson.loads(self._path(key).read_bytes())
+            else:
+                with self._path(key).open("r", encoding="utf-8") as f:
+                    entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("saved_at", 0) > self.max_age:
+            return None
+
+        value = entry.get("value")
+        self._remember(key, entry.get("saved_at", 0), value)
+        return value
+
+    def set(self, key, value):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+
+        # Write then rename so a crash never leaves a half-written entry
+        saved_at = time.time()
+        entry = {"saved_at": saved_at, "value": value}
+        if orjson is not None:
+            tmp_path.write_bytes(orjson.dumps(entry, option=orjson.OPT_NON_STR_KEYS))
+        else:
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self._remember(key, saved_at, value)
+
+    def _remember(self, key, saved_at, value):
+        if not self.keep_in_memory:
+            return
+        self._memory[key] = (saved_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+class InFlight:
+    """
+    Collapses concurrent identical async calls: while a request for a key
+    is running, other callers await the same future instead of re-sending it.
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    async def run(self, key, make_call):
+        """make_call() -> awaitable, only invoked when nothing is in flight for key."""
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await pending
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await make_call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark as retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._pending.pop(key, None)
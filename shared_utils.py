@@ -0,0 +1,30 @@
+# ============================================================
+# SHARED HELPERS (env key loading, optional fast JSON)
+# ============================================================
+
+import os
+import re
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+
+def get_api_keys(prefix):
+    """
+    Finds all env variables named PREFIX_<n> (e.g., GROQ_API_KEY_1)
+    Returns a list of keys in numeric order.
+    """
+    # One pass over the environment; PREFIX_1, PREFIX_2, ... in numeric order
+    pattern = re.compile(rf"^{re.escape(prefix)}_(\d+)$")
+    numbered = []
+    for name, value in os.environ.items():
+        match = pattern.match(name)
+        if match and value:
+            numbered.append((int(match.group(1)), value))
+    keys = [value for _, value in sorted(numbered)]
+    # Fallback: Check for plain key
+    if not keys and os.getenv(prefix):
+        keys.append(os.getenv(prefix))
+    return keys
@@ -0,0 +1,122 @@
+# ============================================================
+# REGRESSION CHECK: VECTORIZED NO-INTENT SCORER vs ROW-WISE ORIGINAL
+# ============================================================
+# Run with: python -m unittest discover tests
+
+import ast
+import itertools
+import re
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_FILE = Path(__file__).resolve().parent.parent / "project_2.py"
+
+# project_2.py is a Streamlit script, so only these definitions are pulled out
+# of it (importing it would run the whole app)
+NEEDED = {
+    "REVENUE_RE", "REVENUE_UNIT_TO_MILLIONS", "EMPLOYEE_COUNT_RE",
+    "REVENUE_RANGES", "EMPLOYEE_RANGES",
+    "normalize_revenue", "normalize_employee_count",
+    "revenue_match_score", "employee_match_score",
+    "match_scores", "join_breakdown",
+    "build_intel_frame", "final_lead_scores_no_intent",
+}
+
+
+def load_scoring_helpers():
+    tree = ast.parse(PROJECT_FILE.read_text(encoding="utf-8"))
+    nodes = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in NEEDED:
+            nodes.append(node)
+        elif isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id in NEEDED for t in node.targets
+        ):
+            nodes.append(node)
+
+    namespace = {"pd": pd, "np": np, "re": re}
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), str(PROJECT_FILE), "exec"), namespace)
+    return namespace
+
+
+P2 = load_scoring_helpers()
+
+
+def final_lead_score_no_intent(row, intel, revenue_q, size_q):
+    """The original per-row scorer (company_df.apply(..., axis=1)), kept as the reference."""
+    score = 0
+    breakdown = []
+
+    for role in row.get("Job_Roles", []):
+        score += 5
+        breakdown.append(f"+5 (Role: {role})")
+
+    company = row["Company"]
+    if company in intel:
+        rev_raw = intel[company].get("Annual Revenue")
+        emp = intel[company].get("Total Employee Count")
+
+        rev_score = P2["revenue_match_score"](P2["normalize_revenue"](rev_raw), revenue_q)
+        emp_score = P2["employee_match_score"](emp, size_q)
+
+        if rev_score > 0:
+            breakdown.append(f"+{rev_score} (Revenue: {rev_raw})")
+        if emp_score > 0:
+            breakdown.append(f"+{emp_score} (Employees: {emp})")
+
+        score += rev_score + emp_score
+
+    return min(score, 100), " | ".join(breakdown)
+
+
+COMPANY_DF = pd.DataFrame({
+    "Company": pd.array(["Acme", "Big", "Unknown", "Tiny", "Mid", "NullCo"], dtype="string[pyarrow]"),
+    "Job_Roles": [
+        pd.array(roles, dtype="string[pyarrow]")
+        for roles in (["SF Dev", "SF Admin"], ["A", "B", "C", "D"], ["Arch"], ["X"], ["Y", "Z"], ["Q"])
+    ],
+})
+
+INTELS = {
+    "empty": {},
+    # Integer headcounts, a null headcount and listed companies without intel
+    "mixed": {
+        "Acme": {"Annual Revenue": "$670.4 million", "Total Employee Count": 500},
+        "Big": {"Annual Revenue": "$14.37B", "Total Employee Count": 6000},
+        "Tiny": {"Annual Revenue": "45 million", "Total Employee Count": 50},
+        "Mid": {"Total Employee Count": "1,100"},
+        "NullCo": {"Annual Revenue": None, "Total Employee Count": None},
+        "Other": {"Annual Revenue": "1 billion"},
+    },
+    "integers_with_gaps": {
+        "Acme": {"Annual Revenue": "₹45 Cr", "Total Employee Count": 90},
+        "Tiny": {"Total Employee Count": 50},
+    },
+}
+
+REVENUE_CHOICES = ["Any", *P2["REVENUE_RANGES"]]
+SIZE_CHOICES = ["Any", *P2["EMPLOYEE_RANGES"]]
+
+
+class NoIntentScoringParityTest(unittest.TestCase):
+
+    def test_matches_row_wise_scorer(self):
+        for (name, intel), revenue_q, size_q in itertools.product(INTELS.items(), REVENUE_CHOICES, SIZE_CHOICES):
+            with self.subTest(intel=name, revenue=revenue_q, size=size_q):
+                expected = [
+                    final_lead_score_no_intent(row, intel, revenue_q, size_q)
+                    for _, row in COMPANY_DF.iterrows()
+                ]
+                scores, breakdown = P2["final_lead_scores_no_intent"](
+                    COMPANY_DF, P2["build_intel_frame"](intel), revenue_q, size_q
+                )
+
+                self.assertEqual([float(s) for s, _ in expected], list(scores))
+                self.assertEqual([b for _, b in expected], list(breakdown))
+
+
+if __name__ == "__main__":
+    unittest.main()
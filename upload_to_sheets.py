@@ -7,6 +7,8 @@ import json
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from shared_utils import orjson
 
 from pathlib import Path
 
@@ -30,42 +32,63 @@ SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")
 
 
 MAX_CELL_CHARS = 49000  # keep buffer below 50k
+WRITE_CHUNK_ROWS = 1000  # rows per appendCells subrequest
 
-def truncate_cell(value):
-    if isinstance(value, str) and len(value) > MAX_CELL_CHARS:
-        return value[:MAX_CELL_CHARS] + "… [TRUNCATED]"
-    return value
+def truncate_long_cells(df):
+    """
+    Cuts strings longer than MAX_CELL_CHARS, one vectorized pass per text column.
+    Non-string cells are left alone.
+    """
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        try:
+            lengths = df[col].str.len()  # NaN for non-string cells
+        except AttributeError:
+            continue  # no strings in this column at all
+
+        too_long = lengths > MAX_CELL_CHARS
+        if too_long.any():
+            df.loc[too_long, col] = df.loc[too_long, col].str.slice(0, MAX_CELL_CHARS) + "… [TRUNCATED]"
+
+    return df
 
 
 def flatten_json(data, parent_key="", sep="_"):
     """
-    Recursively flattens nested JSON.
+    Flattens nested JSON (iteratively, no recursion limit on deep blobs).
     Dict -> parent_child
     List -> comma separated string
     """
     items = {}
 
-    for key, value in data.items():
-        new_key = f"{parent_key}{sep}{key}" if parent_key else key
+    # One (prefix, items iterator) per open dict level; working through the
+    # innermost first keeps the same column order as a depth-first recursion
+    stack = [(parent_key, iter(data.items()))]
 
-        if isinstance(value, dict):
-            items.update(flatten_json(value, new_key, sep))
+    while stack:
+        prefix, pending = stack[-1]
 
-        elif isinstance(value, list):
-            # Convert list items to readable string
-            cleaned_list = []
-            for v in value:
-                if isinstance(v, dict):
-                    cleaned_list.append(
-                        "; ".join(f"{k}:{str(val)}" for k, val in v.items())
-                    )
-                else:
-                    cleaned_list.append(str(v))
+        for key, value in pending:
+            new_key = f"{prefix}{sep}{key}" if prefix else key
 
-            items[new_key] = " | ".join(cleaned_list)
+            # json.load only produces plain dicts / lists, so exact type checks are enough
+            value_type = type(value)
+
+            if value_type is dict:
+                stack.append((new_key, iter(value.items())))
+                break
+
+            elif value_type is list:
+                # Convert list items to readable string
+                items[new_key] = " | ".join(
+                    "; ".join(f"{k}:{val}" for k, val in v.items()) if type(v) is dict else str(v)
+                    for v in value
+                )
+
+            else:
+                items[new_key] = value
 
         else:
-            items[new_key] = value
+            stack.pop()
 
     return items
 
@@ -73,38 +96,122 @@ def flatten_json(data, parent_key="", sep="_"):
 # LOAD ALL STRUCTURED JSON FILES
 # ============================================================
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+LOAD_WORKERS = 32  # file reads are I/O bound, more threads than cores is fine
 
-def load_structured_data(folder_path):
+def _load_one(file):
+    try:
+        if orjson is not None:
+            data = orjson.loads(file.read_bytes())
+        else:
+            with file.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+
+        return flatten_json(data)
+
+    except Exception as e:
+        print(f"❌ Failed to process {file.name}: {e}")
+        return None
+
+def load_structured_data(folder_path, skip_unchanged=None):
+    """
+    One flattened row per structured JSON file.
+    skip_unchanged: {file name: mtime_ns} of files already uploaded, those are left out.
+    Returns (DataFrame, {file name: mtime_ns} of the files that loaded); files
+    that failed to parse are not in the dict, so they are retried next time.
+    """
     folder_path = Path(folder_path)
-    rows = []
 
     if not folder_path.exists():
         print(f"⚠️ Structured data directory not found: {folder_path}")
-        return pd.DataFrame()
+        return pd.DataFrame(), {}
 
-    files = list(folder_path.glob("*.json"))
+    # Snapshot before loading: a file rewritten mid-upload is sent again next run
+    mtimes = {f: f.stat().st_mtime_ns for f in folder_path.glob("*.json")}
 
-    print(f"📂 Found {len(files)} structured JSON files")
+    print(f"📂 Found {len(mtimes)} structured JSON files")
 
-    for file in files:
-        try:
-            with file.open("r", encoding="utf-8") as f:
-                data = json.load(f)
+    files = list(mtimes)
+    if skip_unchanged is not None:
+        files = [f for f in files if mtimes[f] != skip_unchanged.get(f.name)]
+        print(f"🆕 {len(files)} of them changed since the last upload")
+
+    if not files:
+        return pd.DataFrame(), {}
 
-            flat = flatten_json(data)
-            rows.append(flat)
+    # map() keeps the glob order, failed files come back as None
+    with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(files))) as executor:
+        results = list(executor.map(_load_one, files))
 
-        except Exception as e:
-            print(f"❌ Failed to process {file.name}: {e}")
+    rows = [row for row in results if row is not None]
+    loaded = {f.name: mtimes[f] for f, row in zip(files, results) if row is not None}
 
-    return pd.DataFrame(rows)
+    return pd.DataFrame(rows), loaded
 
 import json
 import math
 
+
+def to_cell_data(value):
+    """Python value -> Sheets CellData, stored as-is like valueInputOption=RAW."""
+    if value == "" or value is None:
+        return {}
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            return {}
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
 # ============================================================
 # UPLOAD TO GOOGLE SHEETS
 # ============================================================
+SHEETS_RETRY_STATUSES = (429, 500, 503)  # quota exceeded / transient server errors
+SHEETS_MAX_ATTEMPTS = 6
+
+_sheets_backoff = wait_exponential_jitter(initial=1, max=32)
+
+def _status_code(error):
+    return getattr(error.response, "status_code", error.code)
+
+def _wait_for_sheets(retry_state):
+    # Honour Retry-After when Google sends one, else exponential backoff + jitter
+    retry_after = retry_state.outcome.exception().response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return float(retry_after)
+    return _sheets_backoff(retry_state)
+
+def _call_with_retry(fn, *args, retry_statuses=SHEETS_RETRY_STATUSES, **kwargs):
+    """Runs one Sheets API call, retrying on quota (429) and transient 5xx errors."""
+    for attempt in Retrying(
+        retry=retry_if_exception(
+            lambda e: isinstance(e, gspread.exceptions.APIError) and _status_code(e) in retry_statuses
+        ),
+        wait=_wait_for_sheets,
+        stop=stop_after_attempt(SHEETS_MAX_ATTEMPTS),
+        before_sleep=lambda state: print(
+            f"⏳ Sheets API error {_status_code(state.outcome.exception())}, retrying..."
+        ),
+        reraise=True,
+    ):
+        with attempt:
+            return fn(*args, **kwargs)
+
+# Spreadsheet name -> id, so only the first upload of a process pays for the
+# Drive search behind client.open(name)
+_SPREADSHEET_IDS = {}
+
+def open_spreadsheet(client, sheet_name):
+    spreadsheet_id = _SPREADSHEET_IDS.get(sheet_name)
+    if spreadsheet_id:
+        return _call_with_retry(client.open_by_key, spreadsheet_id)
+
+    spreadsheet = _call_with_retry(client.open, sheet_name)
+    _SPREADSHEET_IDS[sheet_name] = spreadsheet.id
+    return spreadsheet
+
 def upload_to_google_sheets(df, sheet_name, creds_file):
     creds_path = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON")
 
@@ -119,36 +226,89 @@ def upload_to_google_sheets(df, sheet_name, creds_file):
     creds = Credentials.from_service_account_info(service_account_info, scopes=scopes)
     client = gspread.authorize(creds)
 
-    sheet = client.open(sheet_name).sheet1
+    spreadsheet = open_spreadsheet(client, sheet_name)
+    sheet = _call_with_retry(lambda: spreadsheet.sheet1)
     print("📄 Google Sheet opened")
 
-    # Existing data
-    existing = sheet.get_all_records()
-    existing_df = pd.DataFrame(existing)
-
-    df = df.fillna("").applymap(truncate_cell)
+    df = truncate_long_cells(df.fillna(""))
 
     key_col = "company_profile_company_name"
 
-    if existing_df.empty:
-        # First upload
-        sheet.update([df.columns.tolist()] + df.values.tolist())
-        print("✅ First upload completed")
+    # Only the header row and the key column are read back, not the whole
+    # sheet: enough to know which row every existing company lives on.
+    # The key column is normally A, so both come back from one batchGet
+    ranges = _call_with_retry(
+        sheet.spreadsheet.values_batch_get,
+        [f"'{sheet.title}'!1:1", f"'{sheet.title}'!A:A"]
+    )["valueRanges"]
+    header_values = ranges[0].get("values", [])
+    header = header_values[0] if header_values else []
+
+    existing_rows = {}
+    if key_col in header:
+        if header.index(key_col) == 0:
+            keys = [cell[0] if cell else "" for cell in ranges[1].get("values", [])]
+        else:
+            keys = _call_with_retry(sheet.col_values, header.index(key_col) + 1)
+        existing_rows = {str(k): i for i, k in enumerate(keys) if i > 0 and k != ""}
+
+    new_cols = [c for c in df.columns if c not in header]
+    header = header + new_cols
+
+    # Last occurrence wins, same as the old drop_duplicates(keep="last")
+    incoming = {str(r[key_col]): r for r in df.to_dict("records")}
+
+    sheet_id = sheet.id
+    requests = []
+
+    if len(header) > sheet.col_count:
+        requests.append({"appendDimension": {
+            "sheetId": sheet_id,
+            "dimension": "COLUMNS",
+            "length": len(header) - sheet.col_count,
+        }})
+
+    if new_cols:
+        requests.append({"updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+            "rows": [{"values": [to_cell_data(c) for c in header]}],
+            "fields": "userEnteredValue",
+        }})
+
+    appended = []
+    for key, record in incoming.items():
+        row = {"values": [to_cell_data(record.get(c, "")) for c in header]}
+        row_index = existing_rows.get(key)
+
+        if row_index is None:
+            appended.append(row)
+        else:
+            # Whole row is rewritten so stale columns get cleared too
+            requests.append({"updateCells": {
+                "start": {"sheetId": sheet_id, "rowIndex": row_index, "columnIndex": 0},
+                "rows": [row],
+                "fields": "userEnteredValue",
+            }})
+
+    # New rows go out in windows of WRITE_CHUNK_ROWS; still one API call,
+    # but no single subrequest carries the whole upload
+    for start in range(0, len(appended), WRITE_CHUNK_ROWS):
+        requests.append({"appendCells": {
+            "sheetId": sheet_id,
+            "rows": appended[start:start + WRITE_CHUNK_ROWS],
+            "fields": "userEnteredValue",
+        }})
+
+    if not requests:
+        print("⚠️ Nothing to write")
         return
 
-    existing_df = existing_df.fillna("")
-
-    # Merge (UPSERT)
-    merged = pd.concat([existing_df, df]) \
-        .drop_duplicates(subset=[key_col], keep="last")
-    merged = merged.replace([float("inf"), float("-inf")], "")
-    merged = merged.where(pd.notnull(merged), "")
-
-    sheet.clear()
-    sheet.update(
-        [merged.columns.tolist()] + merged.values.tolist()
-    )
+    # Every change goes out in one spreadsheets.batchUpdate call. Only a 429 is
+    # retried here: appendCells is not idempotent, and after a 5xx the batch
+    # may already have been applied
+    _call_with_retry(sheet.spreadsheet.batch_update, {"requests": requests}, retry_statuses=(429,))
 
+    print(f"🔁 {len(incoming) - len(appended)} rows updated, {len(appended)} rows appended")
     print("✅ Sheet updated (UPSERT complete)")
 
 # ============================================================
@@ -158,7 +318,7 @@ def upload_to_google_sheets(df, sheet_name, creds_file):
 if __name__ == "__main__":
     print("🚀 Starting upload process...")
 
-    df = load_structured_data(STRUCTURED_DATA_DIR)
+    df, _ = load_structured_data(STRUCTURED_DATA_DIR)
 
     if df.empty:
         print("⚠️ No data found to upload")
@@ -171,17 +331,33 @@ if __name__ == "__main__":
 
     print("🎉 Process completed")
 
+# file name -> mtime_ns of every structured JSON as of its last successful upload
+# (delete it to force a full re-upload)
+UPLOAD_STATE_FILE = BASE_DIR / ".last_upload.json"
+
+def read_upload_state():
+    try:
+        return json.loads(UPLOAD_STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
 def upload_structured_folder_to_sheets():
-    df = load_structured_data(STRUCTURED_DATA_DIR)
+    state = read_upload_state()
+    df, loaded = load_structured_data(STRUCTURED_DATA_DIR, skip_unchanged=state)
 
     if df.empty:
-        print("⚠️ No structured data found to upload")
+        print("⚠️ No new or changed structured data to upload")
         return
 
+    # Only the changed companies are sent; the keyed upsert leaves other rows alone
     upload_to_google_sheets(
         df=df,
         sheet_name=GOOGLE_SHEET_NAME,
         creds_file=SERVICE_ACCOUNT_FILE
     )
 
+    # Only files that parsed are marked uploaded; the rest are retried next run
+    state.update(loaded)
+    UPLOAD_STATE_FILE.write_text(json.dumps(state), encoding="utf-8")
+
 